@@ -101,6 +101,7 @@ __author__ = "Paul McGuire <ptmcg@users.sourceforge.net>"
 
 import string
 from weakref import ref as wkref
+import codecs
 import copy
 import sys
 import warnings
@@ -127,6 +128,12 @@ try:
 except ImportError:
     from threading import RLock
 
+try:
+    # Python 3
+    from time import perf_counter
+except ImportError:
+    from time import time as perf_counter
+
 try:
     # Python 3
     from collections.abc import Iterable
@@ -200,6 +207,7 @@ __all__ = ['__version__', '__versionTime__', '__author__', '__compat__', '__diag
            'FollowedBy', 'Forward', 'GoToColumn', 'Group', 'Keyword', 'LineEnd', 'LineStart', 'Literal',
            'PrecededBy', 'MatchFirst', 'NoMatch', 'NotAny', 'OneOrMore', 'OnlyOnce', 'Optional', 'Or',
            'ParseBaseException', 'ParseElementEnhance', 'ParseException', 'ParseExpression', 'ParseFatalException',
+           'ParseProfile',
            'ParseResults', 'ParseSyntaxException', 'ParserElement', 'QuotedString', 'RecursiveGrammarException',
            'Regex', 'SkipTo', 'StringEnd', 'StringStart', 'Suppress', 'Token', 'TokenConverter',
            'White', 'Word', 'WordEnd', 'WordStart', 'ZeroOrMore', 'Char',
@@ -1208,6 +1216,85 @@ class ParseResults(object):
 
 MutableMapping.register(ParseResults)
 
+class _StreamWindow(str):
+    """The text of the window that :class:`ParserElement.scanStream` is
+    currently scanning.  ``offset`` is the stream offset of its first
+    character, which lies on line ``lines + 1`` and column ``column + 1``
+    of the stream.
+    """
+    @property
+    def view(self):
+        """The same text as a :class:`_StreamText`, given to parse actions."""
+        try:
+            return self._view
+        except AttributeError:
+            self._view = _StreamText(self)
+            return self._view
+
+class _StreamText(str):
+    """The text of a :class:`_StreamWindow`, indexed by stream offsets
+    rather than by offsets into the window, so that the locations given
+    to parse actions agree with those yielded by
+    :class:`ParserElement.scanStream`.  Text that has already slid out of
+    the window cannot be indexed; slices and searches are clipped to the
+    window instead.
+    """
+    def __new__(cls, window):
+        self = str.__new__(cls, window)
+        self.offset, self.lines, self.column = window.offset, window.lines, window.column
+        return self
+
+    def _range(self, start, end):
+        size = str.__len__(self)
+        start = 0 if start is None else min(max(start - self.offset, 0), size)
+        end = size if end is None else min(max(end - self.offset, 0), size)
+        return start, end
+
+    def _loc(self, i):
+        return i if i < 0 else i + self.offset
+
+    def __len__(self):
+        return self.offset + str.__len__(self)
+
+    def __getitem__(self, key):
+        if isinstance(key, slice):
+            if key.step is not None and key.step < 0:
+                raise ValueError("negative slice steps are not supported on stream text")
+            return str.__getitem__(self, slice(*self._range(key.start, key.stop)))
+        if 0 <= key < self.offset:
+            raise IndexError("stream location %d is no longer in the scan window" % key)
+        return str.__getitem__(self, key - self.offset if key >= 0 else key)
+
+    def find(self, sub, start=None, end=None):
+        return self._loc(str.find(self, sub, *self._range(start, end)))
+
+    def rfind(self, sub, start=None, end=None):
+        return self._loc(str.rfind(self, sub, *self._range(start, end)))
+
+    def index(self, sub, start=None, end=None):
+        return self._loc(str.index(self, sub, *self._range(start, end)))
+
+    def rindex(self, sub, start=None, end=None):
+        return self._loc(str.rindex(self, sub, *self._range(start, end)))
+
+    def count(self, sub, start=None, end=None):
+        return str.count(self, sub, *self._range(start, end))
+
+    def startswith(self, prefix, start=None, end=None):
+        return str.startswith(self, prefix, *self._range(start, end))
+
+    def endswith(self, suffix, start=None, end=None):
+        return str.endswith(self, suffix, *self._range(start, end))
+
+    def lineno(self, loc):
+        return self.lines + self.count("\n", self.offset, loc) + 1
+
+    def col(self, loc):
+        lastCR = self.rfind("\n", self.offset, loc)
+        if lastCR < 0:
+            return self.column + loc - self.offset + 1
+        return loc - lastCR
+
 def col (loc, strg):
     """Returns current column within a string, counting newlines as line separators.
    The first column is number 1.
@@ -1220,6 +1307,8 @@ def col (loc, strg):
    location, and line and column positions within the parsed string.
    """
     s = strg
+    if isinstance(s, _StreamText):
+        return s.col(loc)
     return 1 if 0 < loc < len(s) and s[loc-1] == '\n' else loc - s.rfind("\n", 0, loc)
 
 def lineno(loc, strg):
@@ -1232,6 +1321,8 @@ def lineno(loc, strg):
     suggested methods to maintain a consistent view of the parsed string, the
     parse location, and line and column positions within the parsed string.
     """
+    if isinstance(strg, _StreamText):
+        return strg.lineno(loc)
     return strg.count("\n", 0, loc) + 1
 
 def line(loc, strg):
@@ -1690,11 +1781,15 @@ class ParserElement(object):
 
         retTokens = ParseResults(tokens, self.resultsName, asList=self.saveAsList, modal=self.modalResults)
         if self.parseAction and (doActions or self.callDuringTry):
+            actionString, actionLoc = instring, tokensStart
+            if type(instring) is _StreamWindow:
+                # give actions stream locations, as scanStream yields them
+                actionString, actionLoc = instring.view, instring.offset + tokensStart
             if debugging:
                 try:
                     for fn in self.parseAction:
                         try:
-                            tokens = fn(instring, tokensStart, retTokens)
+                            tokens = fn(actionString, actionLoc, retTokens)
                         except IndexError as parse_action_exc:
                             exc = ParseException("exception raised in parse action")
                             exc.__cause__ = parse_action_exc
@@ -1713,7 +1808,7 @@ class ParserElement(object):
             else:
                 for fn in self.parseAction:
                     try:
-                        tokens = fn(instring, tokensStart, retTokens)
+                        tokens = fn(actionString, actionLoc, retTokens)
                     except IndexError as parse_action_exc:
                         exc = ParseException("exception raised in parse action")
                         exc.__cause__ = parse_action_exc
@@ -1851,12 +1946,40 @@ class ParserElement(object):
                     return value
             else:
                 ParserElement.packrat_cache_stats[HIT] += 1
+                if ParserElement._profile is not None:
+                    ParserElement._profile._stats(self)[ParseProfile.HITS] += 1
                 if isinstance(value, Exception):
                     raise value
                 return value[0], value[1].copy()
 
     _parse = _parseNoCache
 
+    # the active ParseProfile, if any (see ParseProfile)
+    _profile = None
+
+    def _parseProfiled(self, instring, loc, doActions=True, callPreParse=True):
+        profile = ParserElement._profile
+        stats = profile._stats(self)
+        stats[ParseProfile.ATTEMPTS] += 1
+        children = profile._children
+        children.append(0.0)
+        start = perf_counter()
+        try:
+            # packrat parsing may be switched on and off during the session
+            parse = ParserElement._parseCache if ParserElement._packratEnabled else ParserElement._parseNoCache
+            result = parse(self, instring, loc, doActions, callPreParse)
+        except Exception:
+            stats[ParseProfile.FAILS] += 1
+            raise
+        else:
+            stats[ParseProfile.MATCHES] += 1
+            return result
+        finally:
+            elapsed = perf_counter() - start
+            stats[ParseProfile.OWN_TIME] += elapsed - children.pop()
+            stats[ParseProfile.TOTAL_TIME] += elapsed
+            children[-1] += elapsed
+
     @staticmethod
     def resetCache():
         ParserElement.packrat_cache.clear()
@@ -1896,7 +2019,39 @@ class ParserElement(object):
                 ParserElement.packrat_cache = ParserElement._UnboundedCache()
             else:
                 ParserElement.packrat_cache = ParserElement._FifoCache(cache_size_limit)
+            # an active ParseProfile picks the cache up itself
+            if ParserElement._profile is None:
+                ParserElement._parse = ParserElement._parseCache
+
+    @staticmethod
+    @contextmanager
+    def packrat(cache_size_limit=128):
+        """Enables packrat parsing (see :class:`enablePackrat`) only within a
+        ``with`` block, so that other grammars in the same process are not
+        affected.  If packrat parsing was already enabled, it is left enabled,
+        with its existing cache; otherwise it is disabled again, and its cache
+        discarded, when the block exits.
+
+        Example::
+
+            with ParserElement.packrat():
+                result = expr.parseString(text)
+        """
+        if ParserElement._packratEnabled:
+            yield
+            return
+        ParserElement._packratEnabled = True
+        ParserElement.packrat_cache = (ParserElement._UnboundedCache() if cache_size_limit is None
+                                       else ParserElement._FifoCache(cache_size_limit))
+        if ParserElement._profile is None:
             ParserElement._parse = ParserElement._parseCache
+        try:
+            yield
+        finally:
+            ParserElement._packratEnabled = False
+            ParserElement.resetCache()
+            if ParserElement._profile is None:
+                ParserElement._parse = ParserElement._parseNoCache
 
     def parseString(self, instring, parseAll=False):
         """
@@ -2030,6 +2185,138 @@ class ParserElement(object):
                     exc.__traceback__ = self._trim_traceback(exc.__traceback__)
                 raise exc
 
+    def scanStream(self, stream, maxMatches=_MAX_INT, overlap=False,
+                   windowSize=1 << 20, maxMatchLength=1 << 16, lookback=256,
+                   encoding="utf-8"):
+        """
+        Like :class:`scanString`, but scans a stream instead of a string, so
+        that the input does not need to fit in memory.  ``stream`` may be
+        anything with a ``read(size)`` method returning ``str`` or ``bytes``,
+        such as a text or binary file or an ``mmap``, or an iterable of
+        ``str`` or ``bytes`` chunks, such as the lines of a pipe; bytes are
+        decoded incrementally with ``encoding``.
+
+        The input is read through a sliding window of ``windowSize``
+        characters.  A match is only attempted when at least ``maxMatchLength``
+        characters are available after its start (or the end of the input has
+        been read), so no match, including any lookahead needed to find it, may
+        be longer than ``maxMatchLength``.  When the window slides, only the
+        last ``lookback`` characters before the scan position are kept, for the
+        benefit of lookbehind expressions such as :class:`WordStart`.
+
+        Start and end locations are offsets into the stream.  Parse actions
+        receive the same offsets, along with a string that is indexed by them:
+        ``s[loc]``, :class:`lineno`, :class:`col` and :class:`line` all work
+        as usual, but only on the text still held in the window.  Unlike
+        :class:`scanString`, tabs are never expanded, so that locations remain
+        offsets into the stream.
+
+        Example::
+
+            with open("huge.log") as f:
+                for tokens, start, end in Word(nums).scanStream(f):
+                    print(start, tokens[0])
+        """
+        if maxMatchLength < 1 or windowSize <= maxMatchLength + lookback:
+            raise ValueError("windowSize must be larger than maxMatchLength + lookback")
+        if not self.streamlined:
+            self.streamline()
+        for e in self.ignoreExprs:
+            e.streamline()
+
+        if hasattr(stream, "read"):
+            read = stream.read
+        else:
+            chunkIter = iter(stream)
+
+            def read(size):
+                for chunk in chunkIter:
+                    if chunk:
+                        return chunk
+                return None
+
+        decoder = codecs.getincrementaldecoder(encoding)()
+        preparseFn = self.preParse
+        parseFn = self._parse
+        window = ""
+        base = 0   # stream offset of window[0]
+        lines = 0  # newlines before window[0]
+        column = 0 # characters between the last of them and window[0]
+        loc = 0    # scan position, relative to the window
+        eof = False
+        stalled = None
+        skipped = False
+        matches = 0
+        try:
+            while matches < maxMatches:
+                # slide the window and fill it up to windowSize
+                if not eof:
+                    keep = max(0, loc - lookback)
+                    newlines = window.count("\n", 0, keep)
+                    if newlines:
+                        lines += newlines
+                        column = keep - window.rfind("\n", 0, keep) - 1
+                    else:
+                        column += keep
+                    window = window[keep:]
+                    base += keep
+                    loc -= keep
+                    chunks = [window]
+                    size = len(window)
+                    while not eof and size < windowSize:
+                        chunk = read(windowSize - size)
+                        eof = not chunk
+                        if not isinstance(chunk, str):
+                            chunk = decoder.decode(chunk or b"", final=eof)
+                        chunks.append(chunk)
+                        size += len(chunk)
+                    window = _StreamWindow("".join(chunks))
+                    window.offset, window.lines, window.column = base, lines, column
+                    ParserElement.resetCache()
+                limit = len(window) if eof else len(window) - maxMatchLength
+                while loc <= limit and matches < maxMatches:
+                    try:
+                        preloc = preparseFn(window, loc)
+                        if preloc > limit:
+                            # read more input before matching at preloc, and
+                            # skip the whitespace if it does not fit a window
+                            if base + loc == stalled:
+                                loc, skipped = preloc, True
+                            stalled = base + loc
+                            break
+                        nextLoc, tokens = parseFn(window, preloc, callPreParse=False)
+                    except ParseException:
+                        loc = preloc + 1
+                    else:
+                        # after skipping whitespace, behave as if scanning from
+                        # the original position
+                        if nextLoc > loc or skipped:
+                            matches += 1
+                            yield tokens, base + preloc, base + nextLoc
+                            if overlap:
+                                nextloc = preparseFn(window, loc)
+                                if nextloc > loc or skipped:
+                                    loc = nextLoc
+                                else:
+                                    loc += 1
+                            else:
+                                loc = nextLoc
+                        else:
+                            loc = preloc + 1
+                    skipped = False
+                if eof:
+                    break
+        except ParseBaseException as exc:
+            if type(exc.pstr) is _StreamWindow:
+                exc.pstr, exc.loc = exc.pstr.view, exc.pstr.offset + exc.loc
+            if ParserElement.verbose_stacktrace:
+                raise
+            else:
+                # catch and re-raise exception from here, clearing out pyparsing internal stack trace
+                if getattr(exc, '__traceback__', None) is not None:
+                    exc.__traceback__ = self._trim_traceback(exc.__traceback__)
+                raise exc
+
     def transformString(self, instring):
         """
         Extension to :class:`scanString`, to modify matching text with modified tokens that may
@@ -2788,6 +3075,85 @@ class ParserElement(object):
         return success, allResults
 
 
+class ParseProfile(object):
+    """Opt-in instrumentation of a parse session.  While the profile is
+    active (as a context manager), every parser element records how many
+    times it was tried, matched and failed, how many of the attempts were
+    answered by the packrat cache, and the time spent parsing it, both
+    cumulative (including sub-expressions) and its own.  Profiling slows
+    down parsing noticeably, so it is off unless requested.
+
+    Example::
+
+        integer = Word(nums).setName("integer")
+        expr = delimitedList(integer).setName("list")
+        with ParseProfile() as profile:
+            expr.parseString("1, 2, 3")
+        print(profile.report())
+
+    prints::
+
+        element                                  attempts  matches    fails     hits   total (s)     own (s)
+        list                                            1        1        0        0    0.000153    0.000019
+        [{Suppress:(",") integer}]...                   1        1        0        0    0.000118    0.000028
+        {Suppress:(",") integer}                        3        2        1        0    0.000090    0.000030
+        ...
+
+    Cumulative times of recursive elements include their nested attempts.
+    """
+    ATTEMPTS, MATCHES, FAILS, HITS, TOTAL_TIME, OWN_TIME = range(6)
+    COLUMNS = ("attempts", "matches", "fails", "hits", "total (s)", "own (s)")
+
+    def __init__(self):
+        self.elements = {}
+        self.elapsed = 0.0
+        self._children = [0.0]
+
+    def _stats(self, element):
+        try:
+            return self.elements[id(element)][1]
+        except KeyError:
+            stats = [0, 0, 0, 0, 0.0, 0.0]
+            self.elements[id(element)] = (element, stats)
+            return stats
+
+    def __enter__(self):
+        if ParserElement._profile is not None:
+            raise RuntimeError("a ParseProfile is already active")
+        self._start = perf_counter()
+        ParserElement._profile = self
+        ParserElement._parse = ParserElement._parseProfiled
+        return self
+
+    def __exit__(self, *exc_info):
+        # packrat parsing may have been enabled or disabled meanwhile
+        ParserElement._parse = (ParserElement._parseCache if ParserElement._packratEnabled
+                                else ParserElement._parseNoCache)
+        ParserElement._profile = None
+        self.elapsed += perf_counter() - self._start
+        return False
+
+    def results(self, sort_key=TOTAL_TIME):
+        """Returns a list of (element, [attempts, matches, fails, hits,
+        total_time, own_time]) for every element tried during the session,
+        sorted by decreasing sort_key (one of the index constants above).
+        """
+        return sorted(self.elements.values(), key=lambda es: es[1][sort_key], reverse=True)
+
+    def report(self, limit=None, sort_key=TOTAL_TIME, width=40):
+        """Returns the results as a table, one element per line (at most
+        limit lines), with element names truncated to width characters.
+        """
+        lines = ["%-*s %8s %8s %8s %8s %11s %11s" % ((width, "element") + self.COLUMNS)]
+        for element, stats in self.results(sort_key)[:limit]:
+            name = _ustr(element).replace("\n", " ")
+            if len(name) > width:
+                name = name[:width - 3] + "..."
+            lines.append("%-*s %8d %8d %8d %8d %11.6f %11.6f" % ((width, name) + tuple(stats)))
+        lines.append("session: %.6f s" % self.elapsed)
+        return "\n".join(lines)
+
+
 class _PendingSkip(ParserElement):
     # internal placeholder class to hold a place were '...' is added to a parser element,
     # once another ParserElement is added, this placeholder will be replaced with a SkipTo
@@ -5985,7 +6351,193 @@ opAssoc = SimpleNamespace()
 opAssoc.LEFT = object()
 opAssoc.RIGHT = object()
 
-def infixNotation(baseExpr, opList, lpar=Suppress('('), rpar=Suppress(')')):
+class _InfixExpression(ParserElement):
+    """Operator-precedence parser built by ``infixNotation(..., climbing=True)``.
+    Parses each operand once and then tries the operators of each level,
+    from the tightest to the loosest, instead of looking ahead for a whole
+    operation at every level; so it never re-parses an operand, and parse
+    time is linear in the input size.  Produces the same tokens (and calls
+    parse actions in the same way) as the default implementation.
+    """
+    def __init__(self, baseExpr, opList, lpar, rpar):
+        super(_InfixExpression, self).__init__()
+
+        def element(expr):
+            if isinstance(expr, basestring):
+                return self._literalStringClass(expr)
+            return expr
+
+        self.baseExpr = element(baseExpr)
+        self.lpar, self.rpar = element(lpar), element(rpar)
+        self.levels = []
+        for operDef in opList:
+            opExpr, arity, rightLeftAssoc, pa = (operDef + (None, ))[:4]
+            if arity == 3:
+                if opExpr is None or len(opExpr) != 2:
+                    raise ValueError(
+                        "if numterms=3, opExpr must be a tuple or list of two expressions")
+                opExpr = tuple(map(element, opExpr))
+            elif arity in (1, 2):
+                if opExpr is not None:
+                    opExpr = element(opExpr)
+                    if arity == 1 and rightLeftAssoc == opAssoc.RIGHT and isinstance(opExpr, Optional):
+                        opExpr = opExpr.expr
+                elif arity == 1:
+                    raise ValueError("unary operators must have an operator expression")
+            else:
+                raise ValueError("operator must be unary (1), binary (2), or ternary (3)")
+            if rightLeftAssoc not in (opAssoc.LEFT, opAssoc.RIGHT):
+                raise ValueError("operator must indicate right or left associativity")
+            if pa and not isinstance(pa, (tuple, list)):
+                pa = [pa]
+            self.levels.append((opExpr, arity, rightLeftAssoc, [_trim_arity(fn) for fn in pa or ()]))
+        self.mayReturnEmpty = self.baseExpr.mayReturnEmpty
+        self.mayIndexError = False
+        self.errmsg = "Expected " + _ustr(self)
+
+    def _subexpressions(self):
+        yield self.baseExpr
+        yield self.lpar
+        yield self.rpar
+        for opExpr, arity, _, _ in self.levels:
+            if arity == 3:
+                for e in opExpr:
+                    yield e
+            elif opExpr is not None:
+                yield opExpr
+
+    def streamline(self):
+        if not self.streamlined:
+            super(_InfixExpression, self).streamline()
+            for e in self._subexpressions():
+                e.streamline()
+        return self
+
+    def ignore(self, other):
+        super(_InfixExpression, self).ignore(other)
+        for e in self._subexpressions():
+            e.ignore(self.ignoreExprs[-1])
+        return self
+
+    def __str__(self):
+        try:
+            return super(_InfixExpression, self).__str__()
+        except Exception:
+            pass
+        if self.strRepr is None:
+            self.strRepr = "Infix:(%s)" % _ustr(self.baseExpr)
+        return self.strRepr
+
+    def _tryParse(self, expr, instring, loc, doActions):
+        """Returns (loc, tokens) if expr matches at loc, None otherwise.
+        """
+        try:
+            return expr._parse(instring, loc, doActions)
+        except ParseException:
+            return None
+
+    def _operand(self, instring, loc, doActions):
+        try:
+            return self.baseExpr._parse(instring, loc, doActions)
+        except ParseException as pe:
+            error = pe
+        opened = self._tryParse(self.lpar, instring, loc, doActions)
+        if opened is None:
+            raise error
+        # re-enter through _parse (outside of the except clause, to avoid
+        # chaining exceptions) so that packrat parsing caches nested
+        # expressions too
+        loc, inner = self._parse(instring, opened[0], doActions)
+        loc, closed = self.rpar._parse(instring, loc, doActions)
+        return loc, opened[1] + inner + closed
+
+    def _operation(self, instring, start, parts, actions, doActions):
+        tokens = ParseResults([])
+        for part in parts:
+            tokens += part
+        retTokens = ParseResults([tokens])
+        if doActions:
+            for fn in actions:
+                try:
+                    tokens = fn(instring, start, retTokens)
+                except IndexError as parse_action_exc:
+                    exc = ParseException("exception raised in parse action")
+                    exc.__cause__ = parse_action_exc
+                    raise exc
+                if tokens is not None and tokens is not retTokens:
+                    retTokens = ParseResults(tokens, asList=isinstance(tokens, (ParseResults, list)))
+        return retTokens
+
+    def _parseLevel(self, instring, loc, doActions, level):
+        if level < 0:
+            return self._operand(instring, loc, doActions)
+        opExpr, arity, rightLeftAssoc, actions = self.levels[level]
+        start = self.preParse(instring, loc)
+
+        def operand(loc, level=level - 1):
+            return self._parseLevel(instring, loc, doActions, level)
+
+        def tryOperand(loc, level=level - 1):
+            try:
+                return operand(loc, level)
+            except ParseException:
+                return None
+
+        if arity == 1 and rightLeftAssoc == opAssoc.RIGHT:
+            op = self._tryParse(opExpr, instring, loc, doActions)
+            arg = op and tryOperand(op[0], level)
+            if arg is None:
+                return operand(loc)
+            parts = [op[1], arg[1]]
+            loc = arg[0]
+        else:
+            loc, first = operand(loc)
+            parts = [first]
+            while True:
+                if arity == 1:
+                    rest = self._tryParse(opExpr, instring, loc, doActions)
+                    rest = rest and (rest[0], [rest[1]])
+                else:
+                    rest = self._parseTail(instring, loc, doActions, level)
+                if rest is None:
+                    break
+                loc = rest[0]
+                parts.extend(rest[1])
+                if rightLeftAssoc == opAssoc.RIGHT:
+                    break
+            if len(parts) == 1:
+                return loc, first
+        return loc, self._operation(instring, start, parts, actions, doActions)
+
+    def _parseTail(self, instring, loc, doActions, level):
+        """Parses the operators and operands following the first operand
+        of a binary or ternary operation, returning (loc, tokens) or None.
+        """
+        opExpr, arity, rightLeftAssoc, _ = self.levels[level]
+        # right-associative operations nest on their right-hand side
+        operandLevel = level if rightLeftAssoc == opAssoc.RIGHT else level - 1
+        ops = opExpr if arity == 3 else (opExpr, )
+        parts = []
+        for op in ops:
+            if op is not None:
+                matched = self._tryParse(op, instring, loc, doActions)
+                if matched is None:
+                    return None
+                loc = matched[0]
+                parts.append(matched[1])
+            try:
+                loc, arg = self._parseLevel(instring, loc, doActions, operandLevel)
+            except ParseException:
+                return None
+            parts.append(arg)
+        return loc, parts
+
+    def parseImpl(self, instring, loc, doActions=True):
+        # opList goes from the tightest to the loosest level
+        return self._parseLevel(instring, loc, doActions, len(self.levels) - 1)
+
+
+def infixNotation(baseExpr, opList, lpar=Suppress('('), rpar=Suppress(')'), climbing=False):
     """Helper method for constructing grammars of expressions made up of
     operators working in a precedence hierarchy.  Operators may be unary
     or binary, left- or right-associative.  Parse actions can also be
@@ -6024,6 +6576,11 @@ def infixNotation(baseExpr, opList, lpar=Suppress('('), rpar=Suppress(')')):
        (default= ``Suppress('(')``)
      - rpar - expression for matching right-parentheses
        (default= ``Suppress(')')``)
+     - climbing - if True, build a single element that parses operands
+       once and then climbs the precedence levels (default= ``False``).
+       Produces the same results and calls parse actions in the same
+       way, but runs in linear time without packrat parsing and needs far
+       less stack for deeply nested expressions.
 
     Example::
 
@@ -6062,6 +6619,9 @@ def infixNotation(baseExpr, opList, lpar=Suppress('('), rpar=Suppress(')')):
             self.expr.tryParse(instring, loc)
             return loc, []
 
+    if climbing:
+        return _InfixExpression(baseExpr, opList, lpar, rpar)
+
     ret = Forward()
     lastExpr = baseExpr | (lpar + ret + rpar)
     for i, operDef in enumerate(opList):
@@ -1,12 +1,22 @@
 #! /usr/bin/env python3
 
 from collections import namedtuple
+from contextlib import contextmanager
+from functools import lru_cache
 
 from pyparsing import (
     alphanums, alphas, Combine, delimitedList, Forward, Group, infixNotation,
-    Keyword, oneOf, opAssoc, Optional, Suppress, Word)
+    Keyword, oneOf, opAssoc, Optional, ParserElement, ParseResults, Suppress,
+    Word)
 from pyparsing import pyparsing_common as ppc
 
+# EXPR and BEXPR use the precedence-climbing infixNotation, which is
+# linear on its own; but a parenthesised boolean expression is first
+# tried as an arithmetic one, so packrat parsing is still needed to
+# avoid re-parsing nested parentheses. It is only enabled while parsing
+# a property (see parse_property), since the setting is process-wide.
+PACKRAT_CACHE_SIZE = 1024
+
 LPAR, RPAR, LBRAK, RBRAK, COMMA = map(Suppress, "()[],")
 kws = oneOf("and or not id true false forall exists")
 BUILTIN = oneOf("abs max min not")
@@ -20,90 +30,338 @@ BuiltIn = namedtuple("BuiltIn", ["fn", "args"])
 Nary = namedtuple("Nary", ["fn", "args"])
 Quant = namedtuple("Quant", ["quantifier", "typename", "varname", "inner"])
 Prop = namedtuple("Prop", ["modality", "quant"])
+NODES = (OfNode, BinOp, BuiltIn, Nary)
+
+# Hash-consing table: structurally equal nodes built by make_node()
+# are the same object, so formulas are DAGs with shared subterms.
+# A table only lives while a formula is built (see hash_consing),
+# so that it does not keep every node ever built alive.
+_NODES = None
+
+
+@contextmanager
+def hash_consing():
+    """Share the nodes built by make_node() within the block.
+    """
+    global _NODES
+    outer, _NODES = _NODES, {}
+    try:
+        yield
+    finally:
+        _NODES = outer
+
 
+def _node_key(x):
+    if type(x) in NODES:
+        return ("#", id(x))
+    elif isinstance(x, (tuple, list)) and not isinstance(x, str):
+        return tuple(_node_key(y) for y in x)
+    # Keep True and 1 apart (they compare equal)
+    return type(x), x
 
-def pprint(node):
+
+def make_node(cls, *fields):
+    """Return the unique node cls(*fields).
+
+    Children must themselves be built by make_node(), so that
+    nodes can be looked up by the identity of their children
+    (in constant time w.r.t. the size of the subtree).
+    Outside of hash_consing(), nodes are not shared.
+    """
+    fields = tuple(
+        tuple(f) if isinstance(f, (list, ParseResults)) else f
+        for f in fields)
+    if _NODES is None:
+        return cls(*fields)
+    key = (cls, *(_node_key(f) for f in fields))
+    node = _NODES.get(key)
+    if node is None:
+        node = _NODES[key] = cls(*fields)
+    return node
+
+
+def make_binop(toks):
+    """Parse action for left-associative binary operators:
+    a op b op c becomes BinOp(BinOp(a, op, b), op, c)
+    """
+    toks = toks[0]
+    result = toks[0]
+    for op, e2 in zip(toks[1::2], toks[2::2]):
+        result = make_node(BinOp, result, op, e2)
+    return result
+
+
+def pprint(node, memo=None):
+    if memo is None:
+        memo = {}
+    if isinstance(node, bool):
+        return str(node).lower()
+    if type(node) not in NODES:
+        return str(node)
+    if id(node) in memo:
+        return memo[id(node)]
     if isinstance(node, OfNode):
-        return f"{node.var} of {node.agent}"
-    if isinstance(node, BinOp):
-        return f"({pprint(node.e1)} {node.op} {pprint(node.e2)})"
+        result = f"{node.var} of {node.agent}"
+    elif isinstance(node, BinOp):
+        result = f"({pprint(node.e1, memo)} {node.op} {pprint(node.e2, memo)})"  # noqa: E501
     elif isinstance(node, BuiltIn):
-        return f"{node.fn}({', '.join(pprint(a) for a in node.args)})"
-    elif isinstance(node, Nary):
-        return "({})".format(f" {node.fn} ".join(pprint(a) for a in node.args))
+        result = f"{node.fn}({', '.join(pprint(a, memo) for a in node.args)})"  # noqa: E501
     else:
-        return node
+        result = "({})".format(f" {node.fn} ".join(pprint(a, memo) for a in node.args))  # noqa: E501
+    memo[id(node)] = result
+    return result
 
 
-EXPR = Forward()
-BEXPR = Forward()
-OFFSET = LBRAK + EXPR + RBRAK
+# Names identify grammar elements in error messages and profiles
+# (see pyparsing.ParseProfile)
+EXPR = Forward().setName("expression")
+BEXPR = Forward().setName("boolean expression")
+OFFSET = (LBRAK + EXPR + RBRAK).setName("offset")
 
 EXPRATOM = (
     ppc.signed_integer |
-    (VARNAME + Optional(OFFSET, default=None) + Keyword("of").suppress() + VARNAME).setParseAction(lambda toks: OfNode(*toks)) |  # noqa: E501
-    (Combine(BUILTIN + LPAR) + Group(delimitedList(EXPR)) + RPAR).setParseAction(lambda toks: BuiltIn(*toks))  # noqa: E501
-)
+    (VARNAME + Optional(OFFSET, default=None) + Keyword("of").suppress() + VARNAME).setParseAction(lambda toks: make_node(OfNode, *toks)) |  # noqa: E501
+    (Combine(BUILTIN + LPAR) + Group(delimitedList(EXPR)) + RPAR).setParseAction(lambda toks: make_node(BuiltIn, *toks))  # noqa: E501
+).setName("atom")
 
 EXPR <<= infixNotation(EXPRATOM, [
-    ("%", 2, opAssoc.LEFT, lambda x:BinOp(*x[0])),
-    (oneOf("* /"), 2, opAssoc.LEFT, lambda x:BinOp(*x[0])),
-    (oneOf("+ - "), 2, opAssoc.LEFT, lambda x:BinOp(*x[0])),
-    (oneOf("> < = >= <= !="), 2, opAssoc.LEFT, lambda x:BinOp(*x[0]))
-])
+    ("%", 2, opAssoc.LEFT, make_binop),
+    (oneOf("* /"), 2, opAssoc.LEFT, make_binop),
+    (oneOf("+ - "), 2, opAssoc.LEFT, make_binop),
+    (oneOf("> < = >= <= !="), 2, opAssoc.LEFT, make_binop)
+], climbing=True)
 
 BEXPR <<= infixNotation(EXPR, [
     # Note: "not" is implemented as a BuiltIn
-    (oneOf("and or"), 2, opAssoc.LEFT, lambda x:BinOp(*x[0]))
-])
+    (oneOf("and or"), 2, opAssoc.LEFT, make_binop)
+], climbing=True)
 
-QUANT = Forward()
+QUANT = Forward().setName("quantified formula")
 QUANT <<= (
     (Keyword("forall") + TYPENAME + VARNAME + COMMA + QUANT).setParseAction(lambda toks: Quant(*toks)) |  # noqa: E501
     (Keyword("exists") + TYPENAME + VARNAME + COMMA + QUANT).setParseAction(lambda toks: Quant(*toks)) |  # noqa: E501
     BEXPR
 )
 
-PROP = (oneOf("always fairly fairly_inf finally") + QUANT).setParseAction(lambda toks: Prop(*toks))  # noqa: E501
+PROP = (oneOf("always fairly fairly_inf finally") + QUANT).setParseAction(lambda toks: Prop(*toks)).setName("property")  # noqa: E501
 
 
-def contains(formula, var):
+@lru_cache(maxsize=256)
+def parse_property(text):
+    """Parse an ATLAS property into a Prop.
+
+    Results are cached, since nodes are immutable and hash-consed.
+    """
+    with ParserElement.packrat(cache_size_limit=PACKRAT_CACHE_SIZE), \
+            hash_consing():
+        return PROP.parseString(text)[0]
+
+
+def contains(formula, var, memo=None):
     """Return True iff formula contains variable var.
     """
-    if isinstance(formula, OfNode):
-        return formula.agent == var
-    elif isinstance(formula, BinOp):
-        return contains(formula.e1, var) or contains(formula.e2, var)
-    elif isinstance(formula, BuiltIn) or isinstance(formula, Nary):
-        return any(contains(f, var) for f in formula.args)
-    else:
+    if memo is None:
+        memo = {}
+    if type(formula) not in NODES:
         return False
+    key = id(formula)
+    if key not in memo:
+        if isinstance(formula, OfNode):
+            memo[key] = formula.agent == var
+        elif isinstance(formula, BinOp):
+            memo[key] = (
+                contains(formula.e1, var, memo) or
+                contains(formula.e2, var, memo))
+        else:
+            memo[key] = any(contains(f, var, memo) for f in formula.args)
+    return memo[key]
 
 
 def remove_quant(formula, quant, var, agents):
     """Remove the given quantified variable from formula.
+
+    The quantifier is first pushed down through "and"/"or" to the
+    smallest subformulas that contain var (miniscoping). Subterms
+    that do not contain var are then shared by all instances,
+    and each distinct subterm is rewritten once per agent.
     """
 
     map_quant = {"forall": "and", "exists": "or"}
     new_vars = set()
+    has_var = {}
 
-    def replace_with(f, agent):
-        nonlocal new_vars
-        if isinstance(f, OfNode) and f.agent == var:
-            v = f"{f.var}_{agent}"
-            new_vars.add(v)
-            return v
+    def replace_with(f, agent, memo):
+        if not contains(f, var, has_var):
+            return f
+        key = id(f)
+        if key in memo:
+            return memo[key]
+        if isinstance(f, OfNode):
+            result = f"{f.var}_{agent}"
+            new_vars.add(result)
         elif isinstance(f, BinOp):
-            return BinOp(replace_with(f.e1, agent), f.op, replace_with(f.e2, agent))  # noqa: E501
-        elif isinstance(f, BuiltIn):
-            return BuiltIn(f.fn, [replace_with(f, agent) for f in f.args])
-        elif isinstance(f, Nary):
-            return Nary(f.fn, [replace_with(f, agent) for f in f.args])
+            result = make_node(
+                BinOp, replace_with(f.e1, agent, memo), f.op,
+                replace_with(f.e2, agent, memo))
         else:
+            result = make_node(
+                type(f), f.fn,
+                tuple(replace_with(a, agent, memo) for a in f.args))
+        memo[key] = result
+        return result
+
+    def expand(f):
+        return make_node(Nary, map_quant[quant], tuple(
+            replace_with(f, a, {}) for a in agents))
+
+    def eliminate(f):
+        if not contains(f, var, has_var):
             return f
-    return (
-        Nary(map_quant[quant], [replace_with(formula, a) for a in agents]),
-        new_vars)
+        if isinstance(f, BinOp) and f.op in ("and", "or"):
+            conn, parts = f.op, (f.e1, f.e2)
+        elif isinstance(f, Nary) and f.fn in ("and", "or"):
+            conn, parts = f.fn, f.args
+        else:
+            return expand(f)
+        # forall distributes over "and", exists over "or";
+        # any quantifier can skip subformulas that do not contain var
+        if conn == map_quant[quant] or sum(
+                contains(p, var, has_var) for p in parts) == 1:
+            parts = tuple(eliminate(p) for p in parts)
+            return (
+                make_node(BinOp, parts[0], f.op, parts[1])
+                if isinstance(f, BinOp) else make_node(Nary, f.fn, parts))
+        return expand(f)
+
+    return eliminate(formula), new_vars
+
+
+ARITH = {
+    "+": lambda x, y: x + y,
+    "-": lambda x, y: x - y,
+    "*": lambda x, y: x * y,
+    # Only folded on non-negative operands, where truncated
+    # and floored division agree
+    "/": lambda x, y: x // y,
+    "%": lambda x, y: x % y,
+}
+COMPARE = {
+    "=": lambda x, y: x == y,
+    "!=": lambda x, y: x != y,
+    "<": lambda x, y: x < y,
+    "<=": lambda x, y: x <= y,
+    ">": lambda x, y: x > y,
+    ">=": lambda x, y: x >= y,
+}
+FOLD_BUILTIN = {"abs": abs, "max": max, "min": min}
+COMMUTATIVE = ("+", "*", "=", "!=")
+# and/or: (identity, absorbing element, dual connective)
+CONNECTIVES = {"and": (True, False, "or"), "or": (False, True, "and")}
+
+
+def is_const(node):
+    return type(node) is int
+
+
+def simplify(formula):
+    """Normalise a quantifier-free formula.
+
+    Folds constants, rewrites x = x (and similar) to true/false,
+    flattens and/or into deduplicated Nary nodes with absorption,
+    and sorts the arguments of commutative operators so that
+    equivalent subterms are shared.
+    """
+    memo, order = {}, {}
+
+    def key(node):
+        return pprint(node, order)
+
+    def simp(node):
+        if type(node) not in NODES:
+            return node
+        if id(node) in memo:
+            return memo[id(node)]
+        if isinstance(node, BinOp) and node.op in CONNECTIVES:
+            result = connective(node.op, (node.e1, node.e2))
+        elif isinstance(node, Nary) and node.fn in CONNECTIVES:
+            result = connective(node.fn, node.args)
+        elif isinstance(node, BinOp):
+            result = binop(simp(node.e1), node.op, simp(node.e2))
+        elif isinstance(node, BuiltIn):
+            result = builtin(node.fn, tuple(simp(a) for a in node.args))
+        else:
+            result = node
+        memo[id(node)] = result
+        return result
+
+    def binop(e1, op, e2):
+        if is_const(e1) and is_const(e2):
+            if op in COMPARE:
+                return COMPARE[op](e1, e2)
+            if op in ("+", "-", "*") or (e1 >= 0 and e2 > 0):
+                return ARITH[op](e1, e2)
+        # Nodes are hash-consed: identical operands have the same key
+        if op in COMPARE and _node_key(e1) == _node_key(e2):
+            return op in ("=", "<=", ">=")
+        for x, y in ((e1, e2), (e2, e1)):
+            if is_const(x) and (op, x) in (("+", 0), ("*", 1)):
+                return y
+        if op in COMMUTATIVE and key(e2) < key(e1):
+            e1, e2 = e2, e1
+        return make_node(BinOp, e1, op, e2)
+
+    def builtin(fn, args):
+        if fn == "not" and len(args) == 1:
+            arg = args[0]
+            if isinstance(arg, bool):
+                return not arg
+            elif isinstance(arg, BuiltIn) and arg.fn == "not":
+                return arg.args[0]
+        elif fn in FOLD_BUILTIN and all(is_const(a) for a in args):
+            return FOLD_BUILTIN[fn](*args)
+        return make_node(BuiltIn, fn, args)
+
+    def connective(fn, args):
+        identity, absorbing, dual = CONNECTIVES[fn]
+        flat, pending = {}, list(reversed(args))
+        while pending:
+            arg = simp(pending.pop())
+            if arg is absorbing:
+                return absorbing
+            elif arg is identity:
+                continue
+            elif isinstance(arg, Nary) and arg.fn == fn:
+                pending.extend(reversed(arg.args))
+            else:
+                flat[_node_key(arg)] = arg
+        # Absorption: a and (a or b) = a, a or (a and b) = a
+        args = [
+            a for a in flat.values()
+            if not (isinstance(a, Nary) and a.fn == dual and
+                    any(_node_key(b) in flat for b in a.args))]
+        if not args:
+            return identity
+        if len(args) == 1:
+            return args[0]
+        return make_node(Nary, fn, tuple(sorted(args, key=key)))
+
+    return simp(formula)
+
+
+def variables(formula):
+    """Return the set of variables in a quantifier-free formula.
+    """
+    result, seen, pending = set(), set(), [formula]
+    while pending:
+        node = pending.pop()
+        if isinstance(node, str):
+            result.add(node)
+        elif type(node) in NODES and id(node) not in seen:
+            seen.add(id(node))
+            pending.extend(
+                (node.e1, node.e2) if isinstance(node, BinOp)
+                else node.args)
+    return result
 
 
 def get_formula(info):
@@ -128,18 +386,21 @@ def get_formula(info):
         else:
             return {}, formula
 
-    parsed = PROP.parseString(info.properties[0])
-    d, formula = make_dict(parsed[0].quant)
+    parsed = parse_property(info.properties[0])
+    d, formula = make_dict(parsed.quant)
     # remove quantifiers
     # and collect variables created by quantifier elimination
     new_vars = set()
-    for var in d:
-        quant, agent_type = d[var]
-        if contains(formula, var):
-            formula, nv = remove_quant(formula, quant, var, info.spawn.tids(agent_type))  # noqa: E501
-            new_vars = new_vars.union(nv)
+    with hash_consing():
+        for var in d:
+            quant, agent_type = d[var]
+            if contains(formula, var):
+                formula, nv = remove_quant(formula, quant, var, info.spawn.tids(agent_type))  # noqa: E501
+                new_vars = new_vars.union(nv)
 
-    return formula, new_vars, parsed[0].modality
+        formula = simplify(formula)
+    # Do not track variables that simplification removed
+    return formula, new_vars & variables(formula), parsed.modality
 
 
-__all__ = (pprint, get_formula)
+__all__ = (pprint, get_formula, parse_property)
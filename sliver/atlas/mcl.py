@@ -1,6 +1,6 @@
 #! /usr/bin/env python3
 
-from itertools import repeat
+from io import StringIO
 from atlas.atlas import get_formula, OfNode, BinOp, Nary, BuiltIn
 
 
@@ -46,42 +46,69 @@ def preprocess(params, prefix, info):
 
 
 def update_clauses(params, info, fn, box_or_diamond):
-    def params_replace(params, index, repl):
-        return [p if i != index else repl for i, p in enumerate(params)]
-    return (
-        f"({box_or_diamond(sprint_assign(p, info))}"
-        f"{fn}({', '.join(params_replace(params, i, 'v'))}))"
-        for i, p in enumerate(params))
+    """Print one clause per label, matching any update to
+    the variables in params and passing the new value to fn.
 
-
-def sprint_irrelevant(varnames, info, fn, box_or_diamond):
-    """Print a clause matching "irrelevant" transitions
+    Each argument of fn is a conditional expression, so the
+    clauses grow linearly with the number of params.
+    """
+    by_label = {}
+    for p in params:
+        var, agent_id = p.rsplit("_", 1)
+        var_info = info.lookup_var(var)
+        by_label.setdefault(LABEL(var_info.store), {})[p] = (
+            f"(a = {agent_id}) and (x = {var_info.index})")
+    for label, conds in by_label.items():
+        tracked = " or ".join(f"({c})" for c in conds.values())
+        args = ", ".join(
+            f"if {conds[p]} then v else {p} end if" if p in conds else p
+            for p in params)
+        action = f"{{{label} ?a:Nat ?x:Nat ?v:Int ... where {tracked}}}"
+        yield f"({box_or_diamond(action)}{fn}({args}))"
+
+
+def sprint_irrelevant(varnames, info):
+    """Print a macro matching "irrelevant" transitions
     (i.e., those that do not affect satisfaction of Predicate).
+    Without varnames there is nothing to match, and no macro.
     """
     def filter_(vs):
         return " and ".join(f"""(x <> {v.index})""" for v in vs)
 
+    if not varnames:
+        return ""
     var_infos = [info.lookup_var(v) for v in varnames]
     labels = set(LABEL(v.store) for v in var_infos)
-    other_actions = " and ".join(f"(not {{{lbl} ...}})" for lbl in labels)
+    result = " and ".join(f"(not {{{lbl} ...}})" for lbl in labels)
     attrs = {
         s: [v for v in var_infos if v.store == s]
         for s in ("i", "lstig", "e")}
-    result = ""
-    if labels:
-        result += other_actions
     if attrs["i"]:
         result += f" or {{ATTR ?any ?x:Nat ... where ({filter_(attrs['i'])})}}"  # noqa: E501
     if attrs["lstig"]:
         result += f" or {{L ?any ?x:Nat ... where ({filter_(attrs['lstig'])})}}"  # noqa: E501
     if attrs["e"]:
         result += f" or {{E ?any ?x:Nat ... where ({filter_(attrs['e'])})}}"  # noqa: E501
-    if labels:
-        return f"({box_or_diamond(result)} {fn})"
+    return f"""
+macro Irrelevant () =
+    {result}
+end_macro
+"""
+
+
+def irrelevant_clause(fn, box_or_diamond):
+    return f"({box_or_diamond('Irrelevant ()')} {fn})"
+
+
+def sprint_inits(inits):
+    """Print a regular formula reaching the initial values of inits,
+    skipping irrelevant transitions in between.
+    """
+    return " . ".join(f"(Irrelevant ())* . {i}" for i in inits)
 
 
 def sprint_reach(params, info):
-    varnames, _, args = preprocess(params, "args", info)
+    _, _, args = preprocess(params, "args", info)
     macro_params = (f"args_{p}" for p in params)
 
     mcl_or = "\n    or\n    "
@@ -93,7 +120,7 @@ mu R ({", ".join(args)}) . (
     or
     ((<"SPURIOUS"> true) and ([not "SPURIOUS"] false))
     or
-    {sprint_irrelevant(varnames, info, f"R({', '.join(params)})", DIAMOND)}
+    {irrelevant_clause(f"R({', '.join(params)})", DIAMOND)}
     or
     {mcl_or.join(update_clauses(params, info, "R", DIAMOND))})
 end_macro
@@ -101,29 +128,25 @@ end_macro
 
 
 def sprint_finally(params, info):
-    varnames, inits, args = preprocess(params, "", info)
-    irrelevants = f"{sprint_irrelevant(varnames,info, '', lambda x: x)}*"
-    inits = [x for y in zip(repeat(irrelevants), inits) for x in y]
+    _, inits, args = preprocess(params, "", info)
     mcl_and = "\n    and\n    "
     return f"""
-[{" . ".join(inits)}]
+[{sprint_inits(inits)}]
 mu R ({", ".join(args)}) . (
     (Predicate({", ".join(params)})
     or
     ((<"SPURIOUS"> true) and ([not "SPURIOUS"] false)))
     or
-    ({sprint_irrelevant(varnames, info, f"R({', '.join(params)})", BOX)}
+    ({irrelevant_clause(f"R({', '.join(params)})", BOX)}
     and
     {mcl_and.join(update_clauses(params, info, "R", BOX))}))
 """
 
 
 def sprint_invariant(params, info, name="Predicate", short_circuit=None):
-    varnames, inits, nu_params = preprocess(params, "init", info)
     # We must capture irrelevant initializations,
     # otherwise we will get a vacuous pass
-    irrelevants = f"{sprint_irrelevant(varnames,info, '', lambda x: x)}*"  # noqa: E501
-    inits = [x for y in zip(repeat(irrelevants), inits) for x in y]
+    _, inits, nu_params = preprocess(params, "init", info)
     mcl_and = "\n    and\n    "
 
     short_circuit = (
@@ -132,54 +155,95 @@ def sprint_invariant(params, info, name="Predicate", short_circuit=None):
         else "")
 
     return f"""
-[{" . ".join(inits)}]
+[{sprint_inits(inits)}]
 nu Inv ({", ".join(nu_params)}) . (
     {name}({", ".join(params)})
     and
     {short_circuit}{"(" if short_circuit else ""}
-    {sprint_irrelevant(varnames, info, f"Inv({', '.join(params)})", BOX)}
+    {irrelevant_clause(f"Inv({', '.join(params)})", BOX)}
     and
     {mcl_and.join(update_clauses(params, info, "Inv", BOX))}
 {")" if short_circuit else ""})
 """
 
 
-def pprint_mcl(node):
+def pprint_mcl(node, memo=None):
+    if memo is None:
+        memo = {}
     if isinstance(node, OfNode):
         # Should never happen, since node should be the result
         # of get_formula() and thus have no quantified variables.
         raise Exception(f"Unexpected {node}")
+    if isinstance(node, bool):
+        return str(node).lower()
+    if not isinstance(node, (BinOp, BuiltIn, Nary)):
+        return node
+    # node is a DAG: print shared subterms only once
+    if id(node) in memo:
+        return memo[id(node)]
     if isinstance(node, BinOp):
         op = {
             "%": "mod",
             "!=": "<>"
         }.get(node.op) or node.op
-        return f"({pprint_mcl(node.e1)} {op} {pprint_mcl(node.e2)})"
+        result = f"({pprint_mcl(node.e1, memo)} {op} {pprint_mcl(node.e2, memo)})"  # noqa: E501
     elif isinstance(node, BuiltIn):
-        return f"{node.fn}({', '.join(pprint_mcl(a) for a in node.args)})"
-    elif isinstance(node, Nary):
-        return "({})".format(f" {node.fn} ".join(pprint_mcl(a) for a in node.args))  # noqa: E501
+        result = f"{node.fn}({', '.join(pprint_mcl(a, memo) for a in node.args)})"  # noqa: E501
     else:
-        return node
+        result = "({})".format(f" {node.fn} ".join(pprint_mcl(a, memo) for a in node.args))  # noqa: E501
+    memo[id(node)] = result
+    return result
 
 
-def translate_property(info):
-    """Retrieve the first property in info.properties
-    and translate it into MCL.
+def write_property(info, file):
+    """Translate the first property in info.properties into MCL
+    and write it to file, one section at a time.
     """
     formula, new_vars, modality = get_formula(info)
-    result = sprint_predicate(sorted(new_vars), pprint_mcl(formula))
+    if isinstance(formula, bool):
+        # Simplification decided the property: nothing to track
+        file.write(f"{pprint_mcl(formula)}\n")
+        return
+    params = sorted(new_vars)
+    varnames = set(p.rsplit("_", 1)[0] for p in params)
+    file.write(sprint_predicate(params, pprint_mcl(formula)))
+    if not params:
+        # Predicate does not depend on the system: no transition
+        # can change it, so there is nothing else to check
+        file.write("\nPredicate ()\n")
+        return
+    file.write(sprint_irrelevant(varnames, info))
     if modality == "always":
-        result += sprint_invariant(sorted(new_vars), info)
+        file.write(sprint_invariant(params, info))
     elif modality == "finally":
-        result += sprint_finally(sorted(new_vars), info)
+        file.write(sprint_finally(params, info))
     elif modality == "fairly":
-        result += sprint_reach(sorted(new_vars), info)
-        result += sprint_invariant(sorted(new_vars), info, "Reach", short_circuit="Predicate")  # noqa: E501
+        file.write(sprint_reach(params, info))
+        file.write(sprint_invariant(params, info, "Reach", short_circuit="Predicate"))  # noqa: E501
     elif modality == "fairly_inf":
-        result += sprint_reach(sorted(new_vars), info)
-        result += sprint_invariant(sorted(new_vars), info, "Reach")  # noqa: E501
+        file.write(sprint_reach(params, info))
+        file.write(sprint_invariant(params, info, "Reach"))
     else:
         raise Exception(f"Unrecognized modality {modality}")
 
+
+def visible_labels(info):
+    """Return regular expressions matching the labels that the
+    MCL query for the first property in info.properties inspects.
+    """
+    _, new_vars, _ = get_formula(info)
+    result = ["SPURIOUS"]
+    for p in sorted(new_vars):
+        var, agent_id = p.rsplit("_", 1)
+        var_info = info.lookup_var(var)
+        result.append(f"{LABEL(var_info.store)} !{agent_id} !{var_info.index} .*")  # noqa: E501
     return result
+
+
+def translate_property(info):
+    """Retrieve the first property in info.properties
+    and translate it into MCL.
+    """
+    result = StringIO()
+    write_property(info, result)
+    return result.getvalue()
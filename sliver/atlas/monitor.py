@@ -0,0 +1,270 @@
+#!/usr/bin/env python3
+
+"""Runtime monitoring of ATLAS properties over system states.
+
+Properties are evaluated on flat states (see info.StateLayout), such
+as those produced by replay.Replay or read from a trace store.
+Quantifiers range over agent ids at evaluation time instead of being
+expanded into a propositional formula.
+
+Formulas are compiled into Python functions over a state (see
+compile_formula); Monitor.evaluate is a reference interpreter.
+A Watch checks a trace event by event, while it is being written.
+"""
+from collections import namedtuple
+
+from atlas.atlas import (
+    BinOp, BuiltIn, Nary, OfNode, Quant, parse_property)
+from info import StateLayout
+from replay import Replay
+
+# holds: whether the property holds on the trace
+# step: the step that decided the verdict (for "always", the first
+# violation; for "finally", the first step satisfying the predicate)
+Verdict = namedtuple("Verdict", ["holds", "step"])
+STORES = {"e": "E", "i": "I", "lstig": "L"}
+
+
+def c_div(x, y):
+    """Integer division truncating towards zero (as in C).
+    """
+    q = abs(x) // abs(y)
+    return q if (x < 0) == (y < 0) else -q
+
+
+def c_mod(x, y):
+    return x - y * c_div(x, y)
+
+
+OPS = {
+    "+": lambda x, y: x + y,
+    "-": lambda x, y: x - y,
+    "*": lambda x, y: x * y,
+    "/": c_div,
+    "%": c_mod,
+    "=": lambda x, y: x == y,
+    "!=": lambda x, y: x != y,
+    "<": lambda x, y: x < y,
+    "<=": lambda x, y: x <= y,
+    ">": lambda x, y: x > y,
+    ">=": lambda x, y: x >= y,
+}
+BUILTINS = {
+    "abs": abs, "max": max, "min": min, "not": lambda x: not x}
+# Python operators and functions used by compiled formulas
+PY_OPS = {"=": "==", "/": "c_div", "%": "c_mod"}
+PY_GLOBALS = {
+    "__builtins__": {}, "all": all, "any": any, "range": range,
+    "abs": abs, "max": max, "min": min, "c_div": c_div, "c_mod": c_mod}
+
+
+def formula_source(node, info, layout, env=None):
+    """Returns a Python expression that evaluates node over a flat
+    state s. Quantifiers become all()/any() over a range of agent ids,
+    and the position of each variable is folded into a constant plus
+    a multiple of the quantified agent id.
+    """
+    env = env or {}
+
+    def src(n):
+        return formula_source(n, info, layout, env)
+
+    if isinstance(node, Quant):
+        test = "all" if node.quantifier == "forall" else "any"
+        tids = info.spawn.tids(node.typename)
+        agent = f"_a{len(env)}"
+        inner = formula_source(
+            node.inner, info, layout, {**env, node.varname: agent})
+        return f"{test}({inner} for {agent} in range({tids[0]}, {tids[-1] + 1}))"  # noqa: E501
+    elif isinstance(node, OfNode):
+        var = info.lookup_var(node.var)
+        where = STORES[var.store]
+        key = layout.offset(where, 0, var.index)
+        index = str(key)
+        if where == "I":
+            index += f" + {layout.i_size} * {env[node.agent]}"
+        elif where == "L":
+            index += f" + {layout.l_size} * {env[node.agent]}"
+        if node.offset is not None:
+            index += f" + {src(node.offset)}"
+        return f"s[{index}]"
+    elif isinstance(node, BinOp):
+        op = PY_OPS.get(node.op, node.op)
+        if op in ("c_div", "c_mod"):
+            return f"{op}({src(node.e1)}, {src(node.e2)})"
+        return f"({src(node.e1)} {op} {src(node.e2)})"
+    elif isinstance(node, BuiltIn):
+        if node.fn == "not":
+            return f"(not {src(node.args[0])})"
+        return f"{node.fn}({', '.join(src(a) for a in node.args)})"
+    elif isinstance(node, Nary):
+        return "(" + f" {node.fn} ".join(src(a) for a in node.args) + ")"
+    return repr(node)
+
+
+def compile_formula(node, info, layout=None):
+    """Compiles node into a function from a flat state
+    (any sequence indexed as in layout) to its value.
+    """
+    layout = layout or StateLayout(info)
+    source = formula_source(node, info, layout)
+    fn = eval(compile(f"lambda s: {source}", "<atlas>", "eval"), PY_GLOBALS)
+    fn.source = source
+    return fn
+
+
+class Monitor:
+    """Checks an ATLAS property (by default, the first one in
+    info.properties) over the states of a trace.
+
+    Only "always" and "finally" can be decided on a single trace.
+    """
+
+    def __init__(self, info, prop=None):
+        self.info = info
+        self.text = prop or info.properties[0]
+        self.prop = parse_property(self.text)
+        if self.prop.modality not in ("always", "finally"):
+            raise ValueError(
+                f'Cannot monitor "{self.prop.modality}" properties')
+        self.layout = StateLayout(info)
+        self._vars = {}
+        self._validate(self.prop.quant)
+        self.predicate = compile_formula(self.prop.quant, info, self.layout)
+        self.always = self.prop.modality == "always"
+
+    def _validate(self, node):
+        """Raises ValueError if node mentions unknown agent types
+        or variables.
+        """
+        if isinstance(node, Quant):
+            try:
+                self.info.spawn.tids(node.typename)
+            except KeyError:
+                raise ValueError(f"Unknown agent type {node.typename}")
+            self._validate(node.inner)
+        elif isinstance(node, OfNode):
+            try:
+                self._var(node.var)
+            except KeyError:
+                raise ValueError(f"Unknown variable {node.var}")
+            self._validate(node.offset)
+        elif isinstance(node, BinOp):
+            self._validate(node.e1)
+            self._validate(node.e2)
+        elif isinstance(node, (BuiltIn, Nary)):
+            for a in node.args:
+                self._validate(a)
+
+    def _var(self, name):
+        if name not in self._vars:
+            var = self.info.lookup_var(name)
+            self._vars[name] = STORES[var.store], var.index
+        return self._vars[name]
+
+    def evaluate(self, state, node=None, env=None):
+        """Evaluates node (by default, the property's inner formula)
+        on state, where env maps quantified variables to agent ids.
+        """
+        if node is None:
+            node, env = self.prop.quant, {}
+        if isinstance(node, Quant):
+            test = all if node.quantifier == "forall" else any
+            return test(
+                self.evaluate(state, node.inner, {**env, node.varname: a})
+                for a in self.info.spawn.tids(node.typename))
+        elif isinstance(node, OfNode):
+            where, key = self._var(node.var)
+            if node.offset is not None:
+                key += self.evaluate(state, node.offset, env)
+            return state[self.layout.offset(where, env[node.agent], key)]
+        elif isinstance(node, BinOp):
+            if node.op == "and":
+                return (
+                    self.evaluate(state, node.e1, env) and
+                    self.evaluate(state, node.e2, env))
+            elif node.op == "or":
+                return (
+                    self.evaluate(state, node.e1, env) or
+                    self.evaluate(state, node.e2, env))
+            return OPS[node.op](
+                self.evaluate(state, node.e1, env),
+                self.evaluate(state, node.e2, env))
+        elif isinstance(node, BuiltIn):
+            return BUILTINS[node.fn](
+                *(self.evaluate(state, a, env) for a in node.args))
+        elif isinstance(node, Nary):
+            test = all if node.fn == "and" else any
+            return test(self.evaluate(state, a, env) for a in node.args)
+        return node
+
+    def decide(self, step, state):
+        """Returns the Verdict if state decides the property
+        (None otherwise).
+        """
+        if bool(self.predicate(state)) != self.always:
+            return Verdict(not self.always, step)
+        return None
+
+    def check(self, states):
+        """Checks the property over (step, state) pairs and returns
+        a Verdict as soon as it is decided (or at the end of states).
+        """
+        step = None
+        for step, state in states:
+            verdict = self.decide(step, state)
+            if verdict:
+                return verdict
+        return Verdict(self.always, step)
+
+    def check_events(self, events):
+        """Checks the property over a trace, given as events
+        (see cex.Event), while they are being replayed.
+        """
+        return self.check(Replay(self.info).run(events))
+
+    def describe(self, verdict):
+        outcome = "satisfied" if verdict.holds else "violated"
+        if verdict.step is None:
+            return f"<property {outcome} (empty trace)>"
+        if verdict.holds == (self.prop.modality == "always"):
+            return f"<property {outcome} (end of trace, step {verdict.step})>"  # noqa: E501
+        return f"<property {outcome} at step {verdict.step}>"
+
+
+class Watch:
+    """Checks the property of a Monitor over the events of a single
+    trace as they are produced (see send), so that a trace can be
+    checked while it is being written, without buffering it.
+    """
+
+    def __init__(self, monitor):
+        self.monitor = monitor
+        self.replay = Replay(monitor.info)
+        self.verdict = None
+
+    def send(self, ev):
+        """Replays ev, unless the verdict is already decided.
+        """
+        if self.verdict is None:
+            for step, state in self.replay.push(ev):
+                self.verdict = self.monitor.decide(step, state)
+                if self.verdict:
+                    return
+
+    def events(self, events):
+        """Yields events unchanged, sending each one to the monitor.
+        """
+        for ev in events:
+            self.send(ev)
+            yield ev
+
+    def close(self):
+        """Returns the verdict at the end of the trace.
+        """
+        if self.verdict is None:
+            replay = self.replay
+            self.verdict = (
+                self.monitor.decide(replay.step, replay.view) or
+                Verdict(self.monitor.always, replay.step))
+        return self.verdict
@@ -1,15 +1,36 @@
 #!/usr/bin/env python3
+import hashlib
+import json
 import logging
 import os
 import platform
 import re
-from collections import namedtuple
+import shutil
+import sys
+import zlib
+from abc import ABC, abstractmethod
+from collections import Counter, deque, namedtuple
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from contextlib import contextmanager
 from enum import Enum
+from io import StringIO
+from itertools import chain, product
+from multiprocessing import Pool
 from pathlib import Path
-from subprocess import PIPE, run, check_output, CalledProcessError, STDOUT
+from subprocess import (
+    PIPE, Popen, run, check_output, CalledProcessError, STDOUT)
+from tempfile import TemporaryFile, mkdtemp
+from threading import Lock
 
-from cex import translateCPROVER, translate_cadp
-from atlas.mcl import translate_property
+from cex import (
+    translateCPROVER, translate_cadp, cadp_events, cprover_events,
+    TRACE_WRITERS)
+from atlas.mcl import visible_labels, write_property
+from atlas.monitor import Monitor, Watch
+from info import Info
+from pyparsing import ParseException
+from smc import Estimation, SPRT
+from tracestore import TraceWriter
 
 LanguageInfo = namedtuple("LanguageInfo", ["extension", "encoding"])
 log = logging.getLogger('backend')
@@ -21,6 +42,65 @@ class Language(Enum):
     LNT_MONITOR = LanguageInfo(extension="lnt", encoding="lnt-monitor")
 
 
+def stream_output(cmd, cwd):
+    """Runs cmd and yields its output (stdout and stderr) line by line.
+
+    Raises CalledProcessError if cmd fails. To keep memory bounded,
+    the output attribute of the exception only holds the last lines.
+    """
+    tail = deque(maxlen=100)
+    with Popen(cmd, stdout=PIPE, stderr=STDOUT, cwd=cwd, text=True) as proc:
+        for line in proc.stdout:
+            tail.append(line)
+            yield line
+    if proc.returncode != 0:
+        raise CalledProcessError(
+            proc.returncode, cmd, output="".join(tail).encode())
+
+
+_WORKER = {}
+
+
+def _init_simulation_worker(name, base_dir, kwargs, fname, root, info_raw):
+    """Sets up a simulation worker process in its own directory.
+    """
+    cwd = Path(mkdtemp(dir=root))
+    shutil.copy(fname, cwd)
+    backend = ALL_BACKENDS[name](base_dir, **kwargs)
+    backend.cwd = cwd
+    _WORKER.update(
+        backend=backend, fname=str(cwd / Path(fname).name),
+        info=Info.parse(info_raw))
+
+
+def _simulation_worker(i):
+    """Generates the i-th simulation trace in a worker process.
+    Returns whether the simulation succeeded and the rendered trace
+    (or the backend output, if it failed) as zlib-compressed text.
+    """
+    backend = _WORKER["backend"]
+    backend._trace_file = StringIO()
+    try:
+        backend.simulate_one(_WORKER["fname"], _WORKER["info"], i)
+        ok, out = True, backend._trace_file.getvalue()
+    except CalledProcessError as err:
+        ok, out = False, err.output.decode()
+    return ok, zlib.compress(out.encode())
+
+
+def _smc_worker(i):
+    """Generates the i-th simulation trace in a worker process and
+    checks it against the monitored property. Returns whether the
+    simulation succeeded and the verdict (or the backend output).
+    """
+    try:
+        verdict = _WORKER["backend"].judge_one(
+            _WORKER["fname"], _WORKER["info"], i)
+        return True, verdict.holds
+    except CalledProcessError as err:
+        return False, err.output.decode()
+
+
 class ExitStatus(Enum):
     SUCCESS = 0
     BACKEND_ERROR = 1
@@ -45,7 +125,7 @@ class ExitStatus(Enum):
         }.get(code, f"Unexpected exit code {code.value}")
 
 
-class Backend:
+class Backend(ABC):
     """Base class representing a generic analysis backend."""
     def __init__(self, base_dir, **kwargs):
         if "Linux" in platform.system():
@@ -57,14 +137,57 @@ class Backend:
         self.kwargs = kwargs
         self.temp_files = []
         self.modalities = tuple()
+        self.trace_format = kwargs.get("trace_format") or "text"
+        self._trace_file = None
+        self._monitor = None
 
     def cleanup(self, fname):
+        if self._trace_file not in (None, sys.stdout):
+            self._trace_file.close()
         if self.kwargs.get("keep_files"):
             for f in self.temp_files:
                 log.info(f"Keeping {f}")
         else:
             self._safe_remove(self.temp_files)
 
+    def trace_output(self):
+        """Returns the file where traces are written (default: stdout).
+        """
+        if self._trace_file is None:
+            path = self.kwargs.get("trace_file")
+            self._trace_file = open(path, "w") if path else sys.stdout
+        return self._trace_file
+
+    def monitor(self, info):
+        """Returns a Monitor for the property given by --monitor
+        (None if no property was given).
+        """
+        prop = self.kwargs.get("monitor")
+        if prop and self._monitor is None:
+            self._monitor = Monitor(info, prop)
+        return self._monitor
+
+    def print_verdict(self, verdict, info, **extra):
+        """Writes the verdict of the --monitor property on a trace
+        to the trace output.
+        """
+        monitor = self.monitor(info)
+        if self.trace_format == "text":
+            self.trace_message(monitor.describe(verdict))
+        else:
+            file = self.trace_output()
+            file.write(json.dumps({
+                **extra, "property": monitor.text,
+                "holds": verdict.holds, "step": verdict.step}) + "\n")
+            file.flush()
+
+    def trace_message(self, msg):
+        """Writes a human-readable message along with a trace.
+        Messages are omitted for machine-readable formats.
+        """
+        if self.trace_format == "text":
+            print(msg, file=self.trace_output())
+
     def _safe_remove(self, files):
         for f in files:
             try:
@@ -81,13 +204,52 @@ class Backend:
                 return ExitStatus.BACKEND_ERROR
         return ExitStatus.SUCCESS
 
-    def generate_code(self, file, simulate, show):
-        bound, bv, fair, sync = (
-            str(self.kwargs.get("steps", 0)),
-            self.kwargs.get("bv", False),
+    def translate_command(self, file, simulate, bound):
+        """Returns the LabsTranslate command line for file.
+        """
+        call = [
+            self.base_dir / "labs" / "LabsTranslate",
+            "--file", file,
+            "--bound", bound,
+            "--enc", self.language.value.encoding]
+        flags = [
+            (self.kwargs.get("fair", False), "--fair"),
+            (simulate, "--simulation"),
+            (not self.kwargs.get("bv", False), "--no-bitvector"),
+            (self.kwargs.get("sync", False), "--sync"),
+            (self.kwargs["property"], "--property"),
+            (self.kwargs["property"], self.kwargs["property"]),
+            (self.kwargs["no_properties"], "--no-properties")]
+        call.extend(b for a, b in flags if a)
+
+        values = self.kwargs.get("values")
+        if values:
+            call.extend(["--values", *values])
+        return call
+
+    def gather_info(self, file):
+        """Returns information on the system in file,
+        without generating any code.
+        """
+        bound = str(self.kwargs.get("steps", 0))
+        log.debug(f"Gathering information on {file}...")
+        call = self.translate_command(file, False, bound) + ["--info"]
+        return run(call, stdout=PIPE, stderr=PIPE, check=True).stdout.decode()
+
+    def generate_code(self, file, simulate, show, bound=None, info=None):
+        """Translates file into the backend's input language.
+        If bound is given, it overrides --steps and
+        no information on the system is gathered.
+        If info is given (as returned by gather_info), it is
+        returned as is rather than gathered again.
+        """
+        gather_info = bound is None and not show and info is None
+        bound, fair, sync = (
+            str(self.kwargs.get("steps", 0) if bound is None else bound),
             self.kwargs.get("fair", False),
             self.kwargs.get("sync", False)
         )
+        values = self.kwargs.get("values")
         run_args = {"stdout": PIPE, "stderr": PIPE, "check": True}
 
         def make_filename():
@@ -102,27 +264,9 @@ class Backend:
                 result = f"{result}_{'_'.join(options)}"
             return f"{result}.{self.language.value.extension}"
 
-        call = [
-            self.base_dir / "labs" / "LabsTranslate",
-            "--file", file,
-            "--bound", bound,
-            "--enc", self.language.value.encoding]
-        flags = [
-            (fair, "--fair"),
-            (simulate, "--simulation"),
-            (not bv, "--no-bitvector"),
-            (sync, "--sync"),
-            (self.kwargs["property"], "--property"),
-            (self.kwargs["property"], self.kwargs["property"]),
-            (self.kwargs["no_properties"], "--no-properties")]
-        call.extend(b for a, b in flags if a)
-
-        values = self.kwargs.get("values")
-        if values:
-            call.extend(["--values", *values])
+        call = self.translate_command(file, simulate, bound)
         try:
-            info = None
-            if not show:
+            if gather_info:
                 log.debug(f"Gathering information on {file}...")
                 call_info = call + ["--info"]
                 info_call = run(call_info, **run_args)
@@ -160,6 +304,13 @@ class Backend:
         print("This backend does not support simulation.")
         return ExitStatus.BACKEND_ERROR
 
+    def smc(self, fname, info):
+        """Estimates the probability that the program at fname
+        satisfies a property, via random simulation.
+        """
+        print("This backend does not support statistical model checking.")
+        return ExitStatus.BACKEND_ERROR
+
     def verify(self, fname, info):
         """Verifies the correctness of the program at fname.
         """
@@ -172,11 +323,14 @@ class Backend:
             cmd = [self.timeout_cmd, str(self.kwargs["timeout"]), *cmd]
         try:
             log.debug(f"Executing {' '.join(cmd)}")
-            out = check_output(cmd, stderr=STDOUT, cwd=self.cwd).decode()
-            self.verbose_output(out, "Backend output")
-            return self.handle_success(out, info)
+            out = self.verbose_lines(
+                stream_output(cmd, self.cwd), "Backend output")
+            result = self.handle_success(out, info)
+            # Consume any leftover output, so that the exit code is checked
+            for _ in out:
+                pass
+            return result
         except CalledProcessError as err:
-            self.verbose_output(err.output.decode(), "Backend output")
             return self.handle_error(err, fname, info)
 
     def verbose_output(self, output, decorate=None):
@@ -188,7 +342,65 @@ class Backend:
         else:
             log.debug(output)
 
+    def verbose_lines(self, lines, decorate=None):
+        """Logs lines of backend output as they are consumed.
+        """
+        if not log.isEnabledFor(logging.DEBUG):
+            yield from lines
+            return
+        if decorate:
+            log.debug(f"------{decorate}:------")
+        for line in lines:
+            log.debug(line.rstrip("\n"))
+            yield line
+        if decorate:
+            log.debug("---------------------------")
+
+    def store_trace(self, lines, info, path, watch=None):
+        """Translates a trace and saves it in a trace store at path.
+        If watch (see atlas.monitor.Watch) is given, every event is
+        also sent to it as it is stored.
+        """
+        log.debug(f"Writing trace to {path}...")
+        events = self.trace_events(lines, info)
+        with TraceWriter(path, info) as writer:
+            writer.write(watch.events(events) if watch else events)
+
+    def print_trace(self, lines, info, watch=None, **extra):
+        """Translates a trace and writes it to the trace output
+        as it is produced. Machine-readable formats annotate
+        the trace with any extra keyword argument.
+        If watch (see atlas.monitor.Watch) is given, every event is
+        also sent to it as it is translated.
+        """
+        file = self.trace_output()
+        if self.trace_format == "text":
+            chunks = self.translate_trace(
+                lines, info, watch.send if watch else None)
+            for chunk in chunks:
+                file.write(chunk)
+        else:
+            events = self.trace_events(lines, info)
+            TRACE_WRITERS[self.trace_format](
+                watch.events(events) if watch else events, file, **extra)
+        file.flush()
+
+    @abstractmethod
+    def translate_trace(self, lines, info, on_event=None):
+        """Returns a human-readable translation of a trace.
+        If on_event is given, it is called with every event (see
+        trace_events) as the trace is translated.
+        """
+
+    @abstractmethod
+    def trace_events(self, lines, info):
+        """Returns the events (see cex.Event) of a trace.
+        """
+
     def handle_success(self, out, info) -> ExitStatus:
+        """Handles the output of a successful backend run.
+        out is an iterator over the lines of output.
+        """
         return ExitStatus.SUCCESS
 
     def handle_error(self, err, fname, info) -> ExitStatus:
@@ -239,25 +451,185 @@ class CadpMonitor(Backend):
     def simulate(self, fname, info, simulate):
         if not(self.check_cadp()):
             return ExitStatus.BACKEND_ERROR
+        try:
+            self.monitor(info)
+        except (ValueError, KeyError, ParseException) as err:
+            log.error(f"Cannot monitor {self.kwargs['monitor']}: {err}")
+            return ExitStatus.INVALID_ARGS
+        store = self.kwargs.get("trace_store")
+        if store:
+            Path(store).mkdir(parents=True, exist_ok=True)
+        cores = self.kwargs.get("cores", 1)
+        try:
+            if cores > 1 and simulate > 1:
+                return self.simulate_parallel(fname, info, simulate, cores)
+            for i in range(simulate):
+                self.simulate_one(fname, info, i)
+            return ExitStatus.SUCCESS
+        except CalledProcessError as err:
+            self.verbose_output(err.output.decode(), "Backend output")
+            return ExitStatus.BACKEND_ERROR
+        except ValueError as err:
+            # A trace that the trace store cannot hold
+            log.error(err)
+            return ExitStatus.BACKEND_ERROR
+
+    def simulation_command(self, fname):
         cmd = [
             "lnt.open", fname, "executor",
             str(self.kwargs.get("steps", 1)), "2"]
         if self.kwargs.get("timeout", 0) > 0:
             cmd = [self.timeout_cmd, str(self.kwargs["timeout"]), *cmd]
+        return cmd
+
+    def simulate_one(self, fname, info, i):
+        """Generates the i-th simulation trace and writes it
+        to the trace output, or to the trace store directory.
+        """
+        cmd = self.simulation_command(fname)
+        self.verbose_output(f"Executing {' '.join(cmd)}")
+        out = self.verbose_lines(
+            stream_output(cmd, self.cwd), "Backend output")
+        monitor = self.monitor(info)
+        watch = Watch(monitor) if monitor else None
+        store = self.kwargs.get("trace_store")
+        if store:
+            self.store_trace(
+                out, info, Path(store) / f"trace{i+1}.slt", watch)
+            if watch:
+                self.print_verdict(watch.close(), info, trace=i+1)
+            return
+        header = f"====== Trace #{i+1} ======"
+        self.trace_message(header)
+        self.print_trace(out, info, watch, trace=i+1)
+        if watch:
+            self.print_verdict(watch.close(), info, trace=i+1)
+        self.trace_message(f'{"" :=<{len(header)}}')
+
+    def judge_one(self, fname, info, i):
+        """Generates the i-th simulation trace and returns
+        the verdict of the monitored property on it.
+        """
+        out = stream_output(self.simulation_command(fname), self.cwd)
+        verdict = self.monitor(info).check_events(
+            self.trace_events(out, info))
+        # Consume the rest of the trace, so that the exit code is checked
+        for _ in out:
+            pass
+        return verdict
 
+    @contextmanager
+    def worker_pool(self, fname, info, cores):
+        """A pool of worker processes, each one with its own copy
+        of the program at fname in a temporary directory.
+        """
+        root = mkdtemp(prefix="sliver-sim-", dir=self.cwd)
+        kwargs = dict(self.kwargs)
+        if kwargs.get("trace_store"):
+            kwargs["trace_store"] = str(Path(kwargs["trace_store"]).resolve())
+        init_args = (self.name, self.base_dir, kwargs, fname, root, info.raw)
         try:
-            for i in range(simulate):
-                self.verbose_output(f"Executing {' '.join(cmd)}")
-                out = check_output(cmd, stderr=STDOUT, cwd=self.cwd).decode()
-                self.verbose_output(out, "Backend output")
-                header = f"====== Trace #{i+1} ======"
-                print(header)
-                print(*translate_cadp(out, info), sep="", end="")
-                print(f'{"" :=<{len(header)}}')
-            return ExitStatus.SUCCESS
+            with Pool(cores, _init_simulation_worker, init_args) as pool:
+                yield pool
+        finally:
+            if self.kwargs.get("keep_files"):
+                log.info(f"Keeping {root}")
+            else:
+                shutil.rmtree(root, ignore_errors=True)
+
+    def simulate_parallel(self, fname, info, simulate, cores):
+        """Generates and translates simulation traces on a pool of
+        worker processes. Each worker compiles its own copy of the
+        model; translated traces are sent back compressed and
+        written in order.
+        """
+        with self.worker_pool(fname, info, cores) as pool:
+            for ok, chunk in pool.imap(_simulation_worker, range(simulate)):
+                chunk = zlib.decompress(chunk).decode()
+                if not ok:
+                    self.verbose_output(chunk, "Backend output")
+                    return ExitStatus.BACKEND_ERROR
+                out = self.trace_output()
+                out.write(chunk)
+                out.flush()
+        return ExitStatus.SUCCESS
+
+    def smc(self, fname, info):
+        """Statistical model checking of the --monitor property
+        (default: the first property of the system).
+
+        Without --threshold, estimates the probability that a trace
+        satisfies the property within --epsilon, with confidence
+        1 - --delta. With --threshold, tests whether the probability
+        is at least the threshold with a sequential probability ratio
+        test, stopping as soon as the test is decided.
+        """
+        if not(self.check_cadp()):
+            return ExitStatus.BACKEND_ERROR
+        if not self.kwargs.get("monitor"):
+            if not info.properties:
+                log.info("No property to verify!")
+                return ExitStatus.SUCCESS
+            self.kwargs["monitor"] = info.properties[0]
+        try:
+            self.monitor(info)
+        except (ValueError, KeyError, ParseException) as err:
+            log.error(f"Cannot check {self.kwargs['monitor']}: {err}")
+            return ExitStatus.INVALID_ARGS
+        epsilon, delta = self.kwargs["epsilon"], self.kwargs["delta"]
+        threshold = self.kwargs.get("threshold")
+        test = (
+            Estimation(epsilon, delta) if threshold is None
+            else SPRT(threshold, epsilon, delta))
+        log.info(f"Checking {self.kwargs['monitor']} (at most {test.max_samples} traces)...")  # noqa: E501
+        cores = self.kwargs.get("cores", 1)
+        try:
+            if cores > 1:
+                self.smc_parallel(fname, info, test, cores)
+            else:
+                while not test.done:
+                    test.add(self.judge_one(fname, info, test.samples).holds)
         except CalledProcessError as err:
             self.verbose_output(err.output.decode(), "Backend output")
             return ExitStatus.BACKEND_ERROR
+        result = test.result()
+        confidence = f"{100 * (1 - delta):g}%"
+        print(
+            f"Property satisfied in {result.successes}/{result.samples} "
+            f"traces: p = {result.estimate:.4f}, {confidence} "
+            f"confidence interval [{result.low:.4f}, {result.high:.4f}]")
+        if result.decision is None:
+            return ExitStatus.SUCCESS
+        print(
+            f"Hypothesis p >= {threshold} "
+            f"{'accepted' if result.decision else 'rejected'}.")
+        return ExitStatus.SUCCESS if result.decision else ExitStatus.FAILED
+
+    def smc_parallel(self, fname, info, test, cores):
+        """Feeds test with verdicts computed by a pool of worker
+        processes, a batch at a time, until it is done.
+        Verdicts are fed in sampling order, not in completion order:
+        short traces (e.g., early violations) finish first, so the
+        test would otherwise stop on a biased sample.
+        """
+        batch = 4 * cores
+        with self.worker_pool(fname, info, cores) as pool:
+            while not test.done:
+                start = test.samples
+                results = pool.imap(_smc_worker, range(start, start + batch))
+                for ok, holds in results:
+                    if not ok:
+                        raise CalledProcessError(1, "executor", holds.encode())
+                    test.add(holds)
+                    if test.done:
+                        break
+            pool.terminate()
+
+    def translate_trace(self, lines, info, on_event=None):
+        return translate_cadp(lines, info, on_event)
+
+    def trace_events(self, lines, info):
+        return cadp_events(lines, info)
 
     def cleanup(self, fname):
         aux = (str(Path(self.cwd) / f) for f in
@@ -274,20 +646,37 @@ class CadpMonitor(Backend):
         return code.replace("module HEADER is", f"module {base_name} is")
 
     def handle_success(self, out, info) -> ExitStatus:
-        if "\nFALSE\n" in out:
-            if "evaluator.bcg" in out:
-                cex = self.extract_trace()
-                print("Counterexample prefix:")
-                print(*translate_cadp(cex, info), sep="", end="")
-            else:
-                print(*translate_cadp(out, info), sep="", end="")
-            return ExitStatus.FAILED
+        in_bcg = False
+        for line in out:
+            in_bcg = in_bcg or "evaluator.bcg" in line
+            if line.rstrip("\n") == "FALSE":
+                break
         else:
             return super().handle_success(out, info)
+        # Look for either an inline diagnostic or a pointer to the BCG file
+        head = []
+        for line in out:
+            in_bcg = in_bcg or "evaluator.bcg" in line
+            head.append(line)
+            if in_bcg or "<initial state>" in line:
+                break
+        if in_bcg:
+            for _ in out:
+                pass
+            self.trace_message("Counterexample prefix:")
+            self.print_trace(self.extract_trace(), info)
+        else:
+            self.print_inline_trace(chain(head, out), info)
+        return ExitStatus.FAILED
+
+    def print_inline_trace(self, lines, info):
+        """Prints a counterexample found in the evaluator's own output.
+        """
+        self.print_trace(lines, info)
 
     def extract_trace(self):
         cmd = ["bcg_open", "evaluator.bcg", "executor", "100", "2"]
-        return check_output(cmd, stderr=STDOUT, cwd=self.cwd).decode()
+        return stream_output(cmd, self.cwd)
 
 
 class Cadp(CadpMonitor):
@@ -317,28 +706,322 @@ class Cadp(CadpMonitor):
         if self.kwargs.get("no_properties") or not info.properties:
             log.info("No property to verify!")
             return ExitStatus.SUCCESS
-        mcl = translate_property(info)
         mcl_fname = self._mcl_fname(fname)
         log.debug(f"Writing MCL query to {mcl_fname}...")
         with open(mcl_fname, "w") as f:
-            f.write(mcl)
+            write_property(info, f)
         self.temp_files.append(mcl_fname)
         self.args.append(mcl_fname)
         self.debug_args.append(mcl_fname)
-        self.verbose_output(mcl, "MCL property")
+        if log.isEnabledFor(logging.DEBUG):
+            self.verbose_output(Path(mcl_fname).read_text(), "MCL property")
+        if self.kwargs.get("reduce") or self.distributed():
+            try:
+                fname = str(
+                    self.reduce(fname, info) if self.kwargs.get("reduce")
+                    else self.generate_lts(fname))
+            except CalledProcessError as err:
+                self.verbose_output(err.output.decode(), "Backend output")
+                return self.handle_error(err, fname, info)
+            self.command = "bcg_open"
         return Backend.verify(self, fname, info)
 
-    def handle_success(self, out, info) -> ExitStatus:
-        result = super().handle_success(out, info)
-        if "\nFALSE\n" in out and "evaluator.bcg" not in out:
-            print("<property violated>")
-        return result
+    def run_tool(self, cmd, cwd, decorate):
+        """Runs a CADP tool to completion, logging its output.
+        """
+        if self.kwargs.get("timeout", 0) > 0:
+            cmd = [self.timeout_cmd, str(self.kwargs["timeout"]), *cmd]
+        log.debug(f"Executing {' '.join(cmd)}")
+        for _ in self.verbose_lines(stream_output(cmd, cwd), decorate):
+            pass
+
+    def distributed(self):
+        return bool(self.kwargs.get("hosts"))
+
+    def generate_lts(self, fname):
+        """Generates the state space of fname with the CADP Distributor
+        and merges the partitioned result into a single BCG file.
+
+        Workers are spread over the hosts given by --hosts,
+        --cores in total but at least one per host.
+        """
+        path = Path(fname)
+        hosts = [
+            h.strip() for h in self.kwargs["hosts"].split(",") if h.strip()]
+        workers = max(self.kwargs.get("cores", 1), len(hosts))
+        gcf, pbg, bcg = (
+            path.with_suffix(ext) for ext in (".gcf", ".pbg", ".bcg"))
+        gcf.write_text("".join(
+            f'host = "{hosts[i % len(hosts)]}"\n' for i in range(workers)))
+        self.temp_files.extend(str(f) for f in (gcf, pbg, bcg))
+        self.verbose_output(gcf.read_text(), "Grid configuration")
+        self.run_tool(
+            ["lnt.open", path.name, "distributor", gcf.name, pbg.name],
+            path.parent, "Distributor output")
+        self.run_tool(
+            ["bcg_merge", pbg.name, bcg.name], path.parent, "Merge output")
+        return bcg
+
+    def reduce(self, fname, info):
+        """Returns a BCG file with the state space of fname, where only
+        labels that the property depends on are visible, minimised
+        via an SVL script. Reduced state spaces are cached in the
+        lts-cache directory, per model and set of visible labels.
+        """
+        labels = visible_labels(info)
+        modality = info.properties[0].split()[0]
+        # Only safety properties can ignore divergences
+        reduction = "branching" if modality == "always" else "divbranching"
+        digest = hashlib.sha1(Path(fname).read_bytes())
+        digest.update("|".join((reduction, *labels)).encode())
+        cache = Path(self.cwd) / "lts-cache"
+        cache.mkdir(exist_ok=True)
+        bcg = cache / f"{Path(fname).stem}_{digest.hexdigest()[:16]}.bcg"
+        if bcg.exists():
+            log.debug(f"Reusing reduced state space {bcg}")
+            return bcg
+        source = (
+            self.generate_lts(fname) if self.distributed() else Path(fname))
+        tmp_bcg = Path(fname).with_suffix(".reduced.bcg")
+        svl = Path(fname).with_suffix(".svl")
+        visible = ", ".join(f'"{lbl}"' for lbl in labels)
+        svl.write_text(
+            f'"{tmp_bcg.name}" = {reduction} reduction of\n'
+            f'    hide all but {visible} in\n'
+            f'    "{source.name}";\n')
+        self.temp_files.extend((str(svl), str(svl.with_suffix(".log"))))
+        self.verbose_output(svl.read_text(), "SVL script")
+        self.run_tool(["svl", svl.name], svl.parent, "SVL output")
+        # Only cache complete results
+        shutil.move(str(tmp_bcg), str(bcg))
+        return bcg
+
+    def print_inline_trace(self, lines, info):
+        super().print_inline_trace(lines, info)
+        self.trace_message("<property violated>")
 
     def cleanup(self, fname):
         self._safe_remove((self.cwd / "evaluator4", ))
         super().cleanup(fname)
 
 
+class Cbmc(Backend):
+    """Bounded model checking of the C encoding with CBMC.
+
+    The check is split into one job per assertion and per bound
+    (up to --steps), which run in parallel on --cores processes.
+    The violation with the smallest bound is reported.
+    Only "always" properties are split by bound: a "finally"
+    property that does not hold within a shallower bound may still
+    hold within --steps, so it is only checked at the full bound.
+    """
+    def __init__(self, cwd, **kwargs):
+        super().__init__(cwd, **kwargs)
+        self.name = "cbmc"
+        self.modalities = ("always", "finally")
+        self.language = Language.C
+        self.command = "cbmc"
+        self.args = ["--trace"]
+        self.debug_args = ["--trace", "--bounds-check", "--signed-overflow-check"]  # noqa: E501
+        # How to list properties and how to check just one of them
+        self.show_properties = ["--show-properties"]
+        self.property_regex = re.compile(r"^Property (\S+):", re.MULTILINE)
+        self.property_arg = "--property"
+        self.bound_files = {}
+        # (bound, process) of every job started so far; jobs with a
+        # bound above _stopped are not started (None: no limit)
+        self._procs = []
+        self._lock = Lock()
+        self._stopped = None
+
+    def bounds(self):
+        """Returns the bounds to check, in increasing order.
+        """
+        steps, cores = self.kwargs.get("steps", 0), self.kwargs.get("cores", 1)
+        return sorted({
+            max(1, steps * (i + 1) // cores) for i in range(max(1, cores))})
+
+    def generate_code(self, file, simulate, show, bound=None, info=None):
+        if bound is not None or show or simulate:
+            return super().generate_code(file, simulate, show, bound, info)
+        fname, info = super().generate_code(file, simulate, show, info=info)
+        self.bound_files = {self.kwargs.get("steps", 0): fname}
+        # info is the raw output of LabsTranslate --info
+        # (see parse_info in sliver.py)
+        properties = Info.parse(info.replace("\n", "|")[:-1]).properties
+        if any(p.split()[0] != "always" for p in properties):
+            return fname, info
+        for b in self.bounds()[:-1]:
+            self.bound_files[b], _ = super().generate_code(
+                file, simulate, show, bound=b)
+        return fname, info
+
+    def check_bmc(self):
+        if shutil.which(self.command) is None:
+            log.error(f"{self.command} not found. Please, make sure it is in your PATH.")  # noqa: E501
+            return False
+        return True
+
+    def list_properties(self, fname):
+        """Returns the identifiers of the assertions in fname.
+        """
+        out = check_output(
+            [self.command, fname, *self.show_properties],
+            stderr=STDOUT, cwd=self.cwd).decode()
+        return self.property_regex.findall(out)
+
+    def _is_stopped(self, bound):
+        return self._stopped is not None and bound > self._stopped
+
+    def _run_job(self, bound, cmd):
+        """Runs cmd and returns its exit code and its output,
+        spooled to a temporary file rather than held in memory.
+        """
+        with self._lock:
+            if self._is_stopped(bound):
+                return None, None
+            out = TemporaryFile("w+", encoding="utf-8")
+            proc = Popen(cmd, stdout=out, stderr=STDOUT, cwd=self.cwd)
+            self._procs.append((bound, proc))
+        proc.wait()
+        out.seek(0)
+        return proc.returncode, out
+
+    def _stop_jobs(self, above=0):
+        """Terminates the jobs with a bound greater than above
+        (by default, all jobs) and does not start any more of them.
+        """
+        with self._lock:
+            if self._stopped is None or above < self._stopped:
+                self._stopped = above
+            for bound, proc in self._procs:
+                if self._is_stopped(bound) and proc.poll() is None:
+                    proc.terminate()
+
+    def job_status(self, code, out):
+        """Returns the outcome of a job, given its exit code
+        and its output.
+        """
+        try:
+            return ExitStatus(code)
+        except ValueError:
+            return ExitStatus.BACKEND_ERROR
+
+    def verify(self, fname, info):
+        if not self.check_bmc():
+            return ExitStatus.BACKEND_ERROR
+        if self.kwargs.get("no_properties") or not info.properties:
+            log.info("No property to verify!")
+            return ExitStatus.SUCCESS
+        if not self.kwargs.get("steps"):
+            log.error(f"Backend '{self.name}' requires --steps.")
+            return ExitStatus.INVALID_ARGS
+        try:
+            props = self.list_properties(fname) or [None]
+        except CalledProcessError as err:
+            self.verbose_output(err.output.decode(), "Backend output")
+            return ExitStatus.BACKEND_ERROR
+
+        args = self.debug_args if self.kwargs["debug"] else self.args
+        jobs = {}
+        for (bound, bound_fname), prop in product(
+                sorted(self.bound_files.items()), props):
+            cmd = [self.command, bound_fname, *args]
+            if prop is not None:
+                cmd.extend([self.property_arg, prop])
+            if self.kwargs.get("timeout", 0) > 0:
+                cmd = [self.timeout_cmd, str(self.kwargs["timeout"]), *cmd]
+            jobs[(bound, prop)] = cmd
+
+        cores = max(1, self.kwargs.get("cores", 1))
+        log.info(f"Running {len(jobs)} jobs on {cores} cores...")
+        # A violation is only reported once all the jobs with a smaller
+        # bound have passed, so that the shallowest one is reported
+        running = Counter(bound for bound, _ in jobs)
+        violations = {}
+        try:
+            with ThreadPoolExecutor(max_workers=cores) as pool:
+                futures = {
+                    pool.submit(self._run_job, bound, cmd): (bound, prop, cmd)  # noqa: E501
+                    for (bound, prop), cmd in jobs.items()}
+                for fut in as_completed(futures):
+                    bound, prop, cmd = futures[fut]
+                    code, out = fut.result()
+                    if code is None:
+                        continue
+                    if self._is_stopped(bound):
+                        out.close()
+                        continue
+                    running[bound] -= 1
+                    log.debug(f"Executed {' '.join(cmd)}")
+                    if log.isEnabledFor(logging.DEBUG):
+                        deque(self.verbose_lines(
+                            out, f"Backend output ({bound=}, {prop=})"), 0)
+                        out.seek(0)
+                    status = self.job_status(code, out)
+                    if status == ExitStatus.FAILED and bound not in violations:
+                        violations[bound] = prop, out
+                        # Deeper jobs cannot find a shallower violation
+                        self._stop_jobs(above=bound)
+                    else:
+                        out.close()
+                        if status not in (ExitStatus.SUCCESS, ExitStatus.FAILED):  # noqa: E501
+                            self._stop_jobs()
+                            return status
+                    shallowest = min(violations, default=None)
+                    if shallowest is not None and not any(
+                            running[b] for b in running if b < shallowest):
+                        self._stop_jobs()
+                        prop, out = violations[shallowest]
+                        self.trace_message(
+                            f"Violation found within {shallowest} steps:")
+                        self.print_trace(
+                            out, info, bound=shallowest, property=prop)
+                        return ExitStatus.FAILED
+        finally:
+            for _, out in violations.values():
+                out.close()
+        return ExitStatus.SUCCESS
+
+    def translate_trace(self, lines, info, on_event=None):
+        return translateCPROVER(lines, None, info, on_event=on_event)
+
+    def trace_events(self, lines, info):
+        return cprover_events(lines, info)
+
+    def cleanup(self, fname):
+        self._stop_jobs()
+        super().cleanup(fname)
+
+
+class Esbmc(Cbmc):
+    """Bounded model checking of the C encoding with ESBMC.
+    """
+    def __init__(self, cwd, **kwargs):
+        super().__init__(cwd, **kwargs)
+        self.name = "esbmc"
+        self.command = "esbmc"
+        self.args = ["--no-pointer-check", "--no-align-check"]
+        self.debug_args = ["--overflow-check"]
+        self.show_properties = ["--show-claims"]
+        self.property_regex = re.compile(r"^Claim (\S+):", re.MULTILINE)
+        self.property_arg = "--claim"
+
+    def job_status(self, code, out):
+        """ESBMC exits with 1 both on violations and on errors,
+        so violations are told apart by the verdict in the output.
+        """
+        if code == 1:
+            failed = any(
+                line.startswith("VERIFICATION FAILED") for line in out)
+            out.seek(0)
+            if failed:
+                return ExitStatus.FAILED
+        return super().job_status(code, out)
+
+
+# Cbmc and Esbmc are not registered: they need the C templates of
+# LabsTranslate (templates/c), which this tree does not include
 ALL_BACKENDS = {
     **{clz.__name__.lower(): clz for clz in (Cadp, )},
     "cadp-monitor": CadpMonitor
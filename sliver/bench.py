@@ -0,0 +1,214 @@
+#!/usr/bin/env python3
+
+"""Micro-benchmarks for SLiVER's counterexample and property handling.
+
+Usage: ./bench.py [atlas|cadp|cprover|monitor|profile] [N]
+"""
+import sys
+from random import Random
+from time import perf_counter
+
+from info import Info
+
+BENCH_INFO = (
+    "|Bird 0,10|0=x=0..16;1=y=0..16"
+    "|0=leader=id;1=posX=-1;2=posY=-1;3=count=1;4=dirX=[-1,1];5=dirY=[-1,1]"
+    "|finally forall Bird b1, forall Bird b2, leader of b1 = leader of b2")
+
+
+def timed(fn, *args):
+    start = perf_counter()
+    result = fn(*args)
+    return result, perf_counter() - start
+
+
+def report(name, n, elapsed, baseline=None):
+    speedup = f" ({baseline / elapsed:.1f}x)" if baseline else ""
+    print(f"{name:<32} {n:>9} items {elapsed:8.3f}s{speedup}")
+
+
+def synthetic_cadp_trace(n, seed=0):
+    """Return a CADP-like trace with n labels.
+    """
+    rng = Random(seed)
+    labels = [f'"ATTR !{i % 10} !{i % 2} !{i % 16}"' for i in range(20)]
+    labels.append('"ENDINIT"')
+    for _ in range(n - len(labels)):
+        r = rng.random()
+        tid, k, v = rng.randrange(10), rng.randrange(6), rng.randrange(-1, 16)
+        if r < 0.4:
+            labels.append(f'"ATTR !{tid} !{k % 2} !{v}"')
+        elif r < 0.7:
+            labels.append(f'"L !{tid} !{k} !{v}"')
+        elif r < 0.98:
+            labels.append(f'"L !{tid} !{k} !{v} !{rng.randrange(10)}"')
+        else:
+            labels.append(f'"MONITOR !{rng.choice(("TRUE", "FALSE"))}"')
+    return "\n".join(("<initial state>", *labels, "<goal state>"))
+
+
+def synthetic_cprover_trace(n, seed=0):
+    """Return a CBMC-like counterexample with n assignments.
+    """
+    rng = Random(seed)
+    state = 0
+
+    def block(fn, var, value):
+        nonlocal state
+        state += 1
+        return (
+            f"State {state} file labs.c function {fn} line {state % 500} "
+            f"thread 0\n"
+            "----------------------------------------------------\n"
+            f"  {var}={value} (00000000 00000000)\n")
+
+    blocks = ["CBMC version 5.12\n\nCounterexample:\n"]
+    blocks.extend(
+        block("init", f"I[{i % 10}l][{i // 10 % 2}l]", i % 16)
+        for i in range(20))
+    while state < n:
+        tid = rng.randrange(10)
+        blocks.append(block("main", "firstAgent", tid))
+        blocks.append(block(
+            "main", f"I[{tid}l][{rng.randrange(2)}l]", rng.randrange(16)))
+        if rng.random() < 0.1:
+            blocks.append(
+                "Assumption:\n  file labs.c line 12 function main\n"
+                "  guard\n")
+        blocks.append(block("main", "__LABS_step", state))
+    blocks.append(
+        "\nViolated property:\n"
+        "  file labs.c function main line 600 thread 0\n"
+        "  assertion __LABS_assert\n  x\n")
+    return "\n".join(blocks)
+
+
+def synthetic_property(depth, seed=0):
+    """Return an ATLAS property with depth nested parentheses.
+    """
+    rng = Random(seed)
+    ops = ("and", "or")
+    body = "leader of b1 = leader of b2"
+    for i in range(depth):
+        var, cmp = rng.choice(("x", "y")), rng.choice(("<", ">", "!="))
+        body = f"({body} {rng.choice(ops)} {var} of b{i % 2 + 1} {cmp} {i})"
+    return f"finally forall Bird b1, forall Bird b2, {body}"
+
+
+def bench_atlas(n):
+    from pyparsing import ParserElement
+    from atlas.atlas import parse_property
+    # Much deeper nesting exceeds Python's recursion limit in pyparsing
+    for depth in (d for d in (2, 5, 10, 20, 40) if d <= n):
+        props = [synthetic_property(depth, seed) for seed in range(20)]
+
+        def cold():
+            parse_property.cache_clear()
+            ParserElement.resetCache()
+            for p in props:
+                parse_property(p)
+
+        def cached():
+            for p in props:
+                parse_property(p)
+
+        _, slow = timed(cold)
+        report(f"atlas: parse (depth {depth})", len(props), slow)
+        _, fast = timed(cached)
+        report(f"atlas: parse, cached (depth {depth})", len(props), fast, slow)
+
+
+def bench_monitor(n):
+    from atlas.monitor import Monitor
+    info = Info.parse(BENCH_INFO)
+    rng = Random(0)
+    for depth in (0, 4, 8):
+        monitor = Monitor(info, synthetic_property(depth))
+        # Agree on the leader, so that quantifiers are fully evaluated
+        states = [
+            [rng.randrange(16) for _ in range(monitor.layout.size)]
+            for _ in range(100)]
+        for s in states:
+            for a in range(10):
+                s[monitor.layout.offset("L", a, 0)] = 0
+        count = max(n // 100, len(states))
+
+        def run(fn):
+            for i in range(count):
+                fn(states[i % len(states)])
+
+        _, slow = timed(run, monitor.evaluate)
+        report(f"monitor: interpreted (depth {depth})", count, slow)
+        _, fast = timed(run, monitor.predicate)
+        report(f"monitor: compiled (depth {depth})", count, fast, slow)
+
+
+def bench_cprover(n):
+    from cex import cprover_trace
+    for size in (n // 4, n // 2, n):
+        trace = synthetic_cprover_trace(size)
+        count, elapsed = timed(lambda: sum(1 for _ in cprover_trace(trace)))
+        report("cprover: cprover_trace", count, elapsed)
+        print(f"{'':<32} {1e6 * elapsed / count:9.2f} us/assignment")
+
+
+def bench_cadp(n):
+    from cex import CADP_STEP, parse_cadp_step, translate_cadp
+    info = Info.parse(BENCH_INFO)
+    trace = synthetic_cadp_trace(n)
+    lines = [l[1:-1] for l in trace.split("\n") if l[:1] == '"']  # noqa: E741
+
+    def pyparsing_only():
+        for l in lines:  # noqa: E741
+            CADP_STEP.parseString(l, parseAll=True)
+
+    def fast_path():
+        for l in lines:  # noqa: E741
+            parse_cadp_step(l)
+
+    _, slow = timed(pyparsing_only)
+    report("cadp: tokenize (pyparsing)", n, slow)
+    _, fast = timed(fast_path)
+    report("cadp: tokenize (fast path)", n, fast, slow)
+    _, total = timed(lambda: sum(1 for _ in translate_cadp(trace, info)))
+    report("cadp: translate_cadp", n, total)
+
+
+def bench_profile(n):
+    """Report the hottest pyparsing elements of the ATLAS and CADP
+    grammars (n is ignored).
+    """
+    from pyparsing import ParseProfile
+    from atlas.atlas import parse_property
+    from cex import CADP_STEP
+    props = [synthetic_property(8, seed) for seed in range(20)]
+    parse_property.cache_clear()
+    with ParseProfile() as profile:
+        for p in props:
+            parse_property(p)
+    print(f"atlas: {len(props)} properties (depth 8)")
+    print(profile.report(limit=15))
+
+    trace = synthetic_cadp_trace(1000)
+    lines = [l[1:-1] for l in trace.split("\n") if l[:1] == '"']  # noqa: E741
+    with ParseProfile() as profile:
+        for l in lines:  # noqa: E741
+            CADP_STEP.parseString(l, parseAll=True)
+    print(f"\ncadp: {len(lines)} labels")
+    print(profile.report(limit=15))
+
+
+BENCHMARKS = {
+    "atlas": bench_atlas,
+    "cadp": bench_cadp,
+    "cprover": bench_cprover,
+    "monitor": bench_monitor,
+    "profile": bench_profile,
+}
+
+
+if __name__ == "__main__":
+    which = sys.argv[1:2] or list(BENCHMARKS)
+    n = int(sys.argv[2]) if len(sys.argv) > 2 else 10**6
+    for name in which:
+        BENCHMARKS[name](n)
@@ -1,9 +1,12 @@
+import json
 import re
+from array import array
+from collections import namedtuple
+from io import StringIO
 
-from pyparsing import (Word, alphanums, delimitedList, OneOrMore, ZeroOrMore,
+from pyparsing import (Word, alphanums, delimitedList, ZeroOrMore,
                        Forward, Suppress, Group, ParserElement, Keyword,
-                       replaceWith, dblQuotedString, removeQuotes,
-                       SkipTo, LineEnd, printables, Optional, StringEnd)
+                       Regex, replaceWith, dblQuotedString, removeQuotes)
 from pyparsing import pyparsing_common as ppc
 
 ATTR = re.compile(r"I\[([0-9]+)l?\]\[([0-9]+)l?\]")
@@ -24,11 +27,28 @@ BOOLEAN = (
     Keyword("FALSE").setParseAction(replaceWith(False)))
 
 
+# A single assignment in a trace.
+# store is "E", "I" or "L"; index is None for scalar variables,
+# sender is None unless the value was propagated from another agent.
+Event = namedtuple(
+    "Event",
+    ["step", "agent", "store", "variable", "index", "value", "sender"])
+
+
 def pprint_agent(info, tid):
-    return f"{info.spawn[int(tid)]} {tid}"
+    return info.agent_labels[int(tid)]
+
 
+def make_event(info, step, agent, store, key, value, sender=None):
+    variable, index = info.resolve_var(store, int(key))
+    return Event(step, agent, store, variable, index, value, sender)
 
-def translateCPROVER(cex, fname, info, offset=-1):
+
+def translateCPROVER(cex, fname, info, offset=-1, on_event=None):
+    """Translates a CPROVER counterexample into a human-readable format.
+    If on_event is given, it is called with every Event of the trace
+    (see cprover_events) as the trace is translated.
+    """
     def pprint_assign(var, value, tid="", init=False):
         def fmt(match, store_name, tid):
             tid = match[1] if len(match.groups()) > 1 else tid
@@ -49,116 +69,261 @@ def translateCPROVER(cex, fname, info, offset=-1):
         else:
             return ""
 
-    STATE, FILE, FN, LINE, THREAD = (
-        Keyword(tk).suppress() for tk in
-        ("State", "file", "function", "line", "thread"))
-    LBRACE, RBRACE = map(Suppress, "{}")
-    SEP = Keyword("----------------------------------------------------")
-    STUFF = Word(printables)
-    ASSUMPTION = Keyword("Assumption:").suppress() + SkipTo(STATE)
-    INFO = (
-        Optional(STATE + ppc.number().setResultsName("state")) &
-        (FILE + STUFF.setResultsName("file")) &
-        (FN + STUFF.setResultsName("function")) &
-        (LINE + ppc.number().setResultsName("line")) &
-        Optional(THREAD + ppc.number().setResultsName("thread"))
-    ).ignore(ASSUMPTION)
-
-    VAR = Word(printables, excludeChars="=")
-    RECORD = Forward()
-    VAL = ((ppc.number() + Optional(Suppress("u"))) | BOOLEAN | Group(RECORD))
-    RECORD <<= (LBRACE + delimitedList(VAL) + RBRACE)
-
-    ASGN = VAR + Suppress("=") + VAL + SkipTo(LineEnd()).suppress()
-
-    TRACE = OneOrMore(Group(Group(INFO) + SEP.suppress() + Group(ASGN)))
-
-    cex_start_pos = cex.find("Counterexample:") + 15
-    cex_end_pos = cex.find("Violated property:")
-    states = TRACE.parseString(cex[cex_start_pos:cex_end_pos], parseAll=True)
-
-    inits = (
-        s[1] for s in states
-        if s[0]["function"] == "init" and not(LTSTAMP.match(s[1][0])))
-    others = [
-        (s[0]["function"], *s[1]) for s in states
-        if s[0]["function"] not in ("init", "__CPROVER_initialize")]
     yield "<initialization>"
-    for i in inits:
-        pprint = pprint_assign(*i, init=True)
-        if pprint:
-            yield pprint
-    yield "\n<end initialization>"
-
+    init = True
     agent = ""
     system = None
-    for i, (func, var, value) in enumerate(others):
-        if var == "__LABS_step":
+    step, event_agent = 0, None
+    for s in cprover_trace(cex):
+        if on_event and not isinstance(s, CproverViolation):
+            step, event_agent, event = _cprover_event(
+                info, step, event_agent, s)
+            if event:
+                on_event(event)
+        if init and s.function not in ("init", "__CPROVER_initialize"):
+            yield "\n<end initialization>"
+            init = False
+        if isinstance(s, CproverViolation):
+            yield f"\n<property violated: '{s.property}'>\n"
+        elif s.function == "__CPROVER_initialize":
+            continue
+        elif s.function == "init":
+            if not LTSTAMP.match(s.var):
+                pprint = pprint_assign(s.var, s.value, init=True)
+                if pprint:
+                    yield pprint
+        elif s.var == "__LABS_step":
             if system:
                 yield f"\n<end {system}>"
                 system = None
-        elif var == "guessedkey":
-            system = func
-            yield f"\n<{pprint_agent(info, agent)}: {func} '{info.lstig[int(value)].name}'>"  # noqa: E501
-        elif var in ("firstAgent", "guessedcomp"):
-            agent = value
+        elif s.var == "guessedkey":
+            system = s.function
+            yield f"\n<{pprint_agent(info, agent)}: {system} '{info.lstig[int(s.value)].name}'>"  # noqa: E501
+        elif s.var in ("firstAgent", "guessedcomp"):
+            agent = s.value
         else:
-            if (len(others) > i + 1 and LSTIG.match(var) and
-                    LTSTAMP.match(others[i + 1][0])):
-                pprint = pprint_assign(var, value, agent, endline=" ")
-            else:
-                pprint = pprint_assign(var, value, agent)
+            pprint = pprint_assign(s.var, s.value, agent)
             if pprint:
                 yield pprint
 
-    prova = cex[cex_end_pos + 18:]
-    PROP = Suppress(INFO) + STUFF + Suppress(SkipTo(StringEnd()))
-    prop = PROP.parseString(prova)
-    yield f"\n<property violated: '{prop[0]}'>\n"
-
-
-def translate_cadp(cex, info):
-    def pprint_init_agent(args):
-        tid, iface = args[1], args[2][1:]
-        agent = pprint_agent(info, tid)
-        init = "".join(
-            f"{agent}:\t{info.pprint_assign('I', int(k), v)}\n"
-            for k, v in enumerate(iface))
-        if len(args) == 4:
-            return init
-
-        lstig = args[3][1:]
-        init += "".join(
-            f"{agent}:\t{info.pprint_assign('L', int(k), v[1])},{v[2]}\n"
-            for k, v in enumerate(lstig)
-        )
-        return init
-
-    def pprint_init_env(args):
-        return "".join(
-            f"\t{info.pprint_assign('E', int(k), v)}\n"
-            for k, v in enumerate(args[1:]))
-
-    lines = cex.split('\n')
-    first_line = [i+1 for i, l in enumerate(lines) if "<initial state>" in l][0]  # noqa: E501
-    lines = [l[1:-1] for l in lines[first_line:] if l and l[0] == '"']  # noqa: E501, E741
 
+# A single "State" block of a CPROVER counterexample
+CproverState = namedtuple(
+    "CproverState",
+    ["state", "file", "function", "line", "thread", "var", "value"])
+# The location and name of the violated property
+# (function is always None)
+CproverViolation = namedtuple(
+    "CproverViolation", ["file", "function", "line", "thread", "property"])
+
+CPROVER_NUMBER = re.compile(
+    r"[-+]?[0-9]+(\.[0-9]*)?([eE][-+]?[0-9]+)?u?")
+
+
+def _cprover_header(line):
+    """Parses a line such as "State 10 file f.c function main line 4"
+    """
+    tokens = line.split()
+    fields = dict(zip(tokens[::2], tokens[1::2]))
+    return (
+        int(fields["State"]) if "State" in fields else None,
+        fields.get("file"), fields.get("function"),
+        int(fields["line"]) if "line" in fields else None,
+        int(fields["thread"]) if "thread" in fields else None)
+
+
+def _cprover_value(text, pos=0):
+    """Parses a value (number, boolean, or {record}) at text[pos:].
+    Returns the value and the position right after it.
+    """
+    while text.startswith(" ", pos):
+        pos += 1
+    if text.startswith("{", pos):
+        items, pos = [], pos + 1
+        while True:
+            while text.startswith(" ", pos):
+                pos += 1
+            if text.startswith("}", pos) or pos >= len(text):
+                return items, pos + 1
+            value, pos = _cprover_value(text, pos)
+            items.append(value)
+            while text.startswith(" ", pos):
+                pos += 1
+            if text.startswith(",", pos):
+                pos += 1
+    for keyword, value in (
+            ("TRUE", True), ("FALSE", False),
+            ("true", True), ("false", False)):
+        if text.startswith(keyword, pos):
+            return value, pos + len(keyword)
+    match = CPROVER_NUMBER.match(text, pos)
+    if match:
+        number = match[0].rstrip("u")
+        value = float(number) if match[1] or match[2] else int(number)
+        return value, match.end()
+    end = text.find(" ", pos)
+    end = len(text) if end == -1 else end
+    return text[pos:end], end
+
+
+# The parts of a CPROVER counterexample: its start, a state (header,
+# dashes and assignment), the violated property (followed by its location
+# and description), or any other line
+CPROVER_TRACE = Regex(
+    r"Counterexample:"
+    r"|(?P<state>State .*)\n\s*-----.*\n\s*"
+    r"(?P<assign>(?!State |Violated property:).+)"
+    r"|Violated property:.*\n\s*(?P<location>.+)\n\s*(?P<property>.+)"
+    r"|.+", asMatch=True)
+
+
+def cprover_trace(cex):
+    """Parses a CPROVER counterexample in a single pass.
+
+    cex is the whole output of the model checker as a string, a file
+    object, or an iterable of lines; it is scanned with a bounded window
+    (see scanStream in pyparsing). Yields a CproverState for every
+    assignment in the counterexample and, at the end, a CproverViolation.
+    """
+    source = StringIO(cex) if isinstance(cex, str) else cex
+    in_trace = False
+    for (match,), _, _ in CPROVER_TRACE.scanStream(
+            source, windowSize=1 << 22, maxMatchLength=1 << 20):
+        if not in_trace:
+            in_trace = match[0] == "Counterexample:"
+        elif match["state"]:
+            # ESBMC puts spaces around "="
+            var, _, value = match["assign"].partition("=")
+            yield CproverState(
+                *_cprover_header(match["state"]),
+                var.rstrip(), _cprover_value(value.rstrip())[0])
+        elif match["location"]:
+            _, file, _, line, thread = _cprover_header(match["location"])
+            prop = match["property"].split()[0]
+            yield CproverViolation(file, None, line, thread, prop)
+            return
+
+
+def _cprover_event(info, step, agent, s):
+    """Interprets the CproverState s, given the current step and agent.
+    Returns the updated step and agent, and the Event of s
+    (None if s does not assign a system variable).
+    """
+    var, value = s.var, s.value
+    if s.function == "__CPROVER_initialize":
+        return step, agent, None
+    if var == "__LABS_step":
+        step += 1
+    elif var in ("firstAgent", "guessedcomp"):
+        agent = value
+    for regex, store in ((ATTR, "I"), (LSTIG, "L"), (ENV, "E")):
+        match = regex.match(var)
+        if match and info.store(store):
+            tid = int(match[1]) if len(match.groups()) > 1 else agent
+            key = match[2] if len(match.groups()) > 1 else match[1]
+            return step, agent, make_event(info, step, tid, store, key, value)
+    return step, agent, None
+
+
+def cprover_events(cex, info):
+    """Yields an Event for every assignment in a CPROVER counterexample.
+    Step 0 is the initialization, every __LABS_step starts a new step.
+    """
+    step, agent = 0, None
+    for s in cprover_trace(cex):
+        if isinstance(s, CproverViolation):
+            break
+        step, agent, event = _cprover_event(info, step, agent, s)
+        if event:
+            yield event
+
+
+def _cadp_grammar():
+    """Build the pyparsing grammar for labels of CADP traces.
+
+    Whitespace settings are restored afterwards, so that
+    other grammars are not affected.
+    """
+    default_whitespace = ParserElement.DEFAULT_WHITE_CHARS
     ParserElement.setDefaultWhitespaceChars(' \t\n\x01\x02')
-    NAME = Word(alphanums)
-    LPAR, RPAR = map(Suppress, "()")
-    RECORD = Forward()
-    OBJ = (ppc.number() | BOOLEAN | Group(RECORD))
-    RECORD <<= (NAME + LPAR + delimitedList(OBJ) + RPAR)
+    try:
+        NAME = Word(alphanums)
+        LPAR, RPAR = map(Suppress, "()")
+        RECORD = Forward().setName("record")
+        OBJ = (ppc.number() | BOOLEAN | Group(RECORD)).setName("value")
+        RECORD <<= (NAME + LPAR + delimitedList(OBJ) + RPAR)
+
+        QUOTES = dblQuotedString.setParseAction(removeQuotes)
+        ASGN = (NAME + ZeroOrMore(Suppress("!") + OBJ)).setName("assignment")
+        MONITOR = (Keyword("MONITOR") + Suppress("!") + (BOOLEAN | QUOTES)).setName("monitor")  # noqa: E501
+        return (ppc.number() | ASGN | MONITOR).setName("label")
+    finally:
+        ParserElement.setDefaultWhitespaceChars(default_whitespace)
 
-    QUOTES = dblQuotedString.setParseAction(removeQuotes)
-    ASGN = NAME + ZeroOrMore(Suppress("!") + OBJ)
-    MONITOR = (Keyword("MONITOR") + Suppress("!") + (BOOLEAN | QUOTES))
-    STEP = ppc.number() | ASGN | MONITOR
+
+CADP_STEP = _cadp_grammar()
+# Fast paths for the most common labels, e.g. "ATTR !0 !1 !3", "ENDINIT"
+CADP_LABEL = re.compile(r"([A-Za-z][A-Za-z0-9]*)((?: ![-]?[0-9]+)*)")
+CADP_MONITOR = re.compile(r"MONITOR !(TRUE|FALSE)")
+CADP_STORES = {"ATTR": "I", "L": "L", "E": "E"}
+
+
+def parse_cadp_step(line):
+    """Tokenize a single label of a CADP trace.
+
+    Labels with integer-only arguments and boolean monitor labels
+    are matched by regular expressions, anything else is
+    handled by the full CADP_STEP grammar.
+    """
+    match = CADP_LABEL.fullmatch(line)
+    if match:
+        name, args = match.groups()
+        return [name, *(int(x) for x in args.split(" !")[1:])]
+    match = CADP_MONITOR.fullmatch(line)
+    if match:
+        return ["MONITOR", match[1] == "TRUE"]
+    return CADP_STEP.parseString(line, parseAll=True).asList()
+
+
+# A quoted label on a line of its own, or the start of a CADP trace
+CADP_TRACE = Regex(r'^".*"$|<initial state>', re.M)
+
+
+def cadp_labels(cex):
+    """Yields the labels of a CADP trace, given a file object or an
+    iterable of lines; they are scanned with a bounded window (see
+    scanStream in pyparsing). Lines before "<initial state>" are ignored.
+    """
+    labels = CADP_TRACE.scanStream(cex)
+    for (label,), _, _ in labels:
+        if label == "<initial state>":
+            break
+    for (label,), _, _ in labels:
+        if label[0] == '"':
+            yield label[1:-1]
+
+
+def translate_cadp(cex, info, on_event=None):
+    """Translates a CADP trace into a human-readable format.
+
+    cex is either the whole trace as a string or an iterable of lines
+    (e.g., the stdout of a running process). The result is produced
+    incrementally, without keeping the whole trace in memory.
+    If on_event is given, it is called with every Event of the trace
+    (see cadp_steps) as the trace is translated.
+    """
+    if on_event:
+        steps = cadp_steps(cex, info)
+    else:
+        steps = (
+            (parse_cadp_step(label), None) for label in
+            cadp_labels(StringIO(cex) if isinstance(cex, str) else cex))
 
     yield "<initialization>\n"
 
-    for l in lines:    # noqa: E741
-        step = STEP.parseString(l, parseAll=True)
+    for step, event in steps:
+        if event:
+            on_event(event)
         if step[0] == "ENDINIT":
             yield "<end initialization>\n"
         elif step[0] == "MONITOR" and step[1] == "deadlock":
@@ -167,8 +332,7 @@ def translate_cadp(cex, info):
             yield f"""<property {"satisfied" if step[1] else "violated"}>\n"""
         elif step[0] == "E":
             agent = pprint_agent(info, step[1])
-            yield f"{step.asList()}"
-            yield f"{agent}:\t{info.pprint_assign(*step[:3])}\n"
+            yield f"{agent}:\t{info.pprint_assign('E', *step[2:4])}\n"
         elif step[0] == "ATTR":
             agent = pprint_agent(info, step[1])
             yield f"{agent}:\t{info.pprint_assign('I', *step[2:4])}\n"
@@ -182,3 +346,92 @@ def translate_cadp(cex, info):
                 yield f"{agent}:\t{info.pprint_assign('L', *step[2:4])}\n"
         else:
             yield f"<could not parse: {step}>\n"
+
+
+def cadp_steps(cex, info):
+    """Tokenizes every label of a CADP trace and yields the tokens,
+    together with the Event of the label (None if it is not an
+    assignment). Step 0 is the initialization, every later assignment
+    is a new step.
+    """
+    step = 0
+    for label in cadp_labels(StringIO(cex) if isinstance(cex, str) else cex):
+        tokens = parse_cadp_step(label)
+        event = None
+        if tokens[0] == "ENDINIT":
+            step = 1
+        elif tokens[0] in CADP_STORES and len(tokens) >= 4:
+            sender = tokens[4] if len(tokens) > 4 else None
+            event = make_event(
+                info, step, tokens[1], CADP_STORES[tokens[0]],
+                *tokens[2:4], sender)
+            if step:
+                step += 1
+        yield tokens, event
+
+
+def cadp_events(cex, info):
+    """Yields an Event for every assignment in a CADP trace
+    (see cadp_steps).
+    """
+    return (event for _, event in cadp_steps(cex, info) if event)
+
+
+def write_ndjson(events, file, **extra):
+    """Writes events to file, one JSON object per line.
+    Any extra keyword argument is added to every object.
+    """
+    for ev in events:
+        file.write(json.dumps({**extra, **ev._asdict()}))
+        file.write("\n")
+
+
+def _append_value(col, value):
+    """Appends value to the value column of col. The column is a
+    compact integer array until a value that is not an integer
+    (e.g., a boolean or a record) turns it into a list of values.
+    """
+    values = col["value"]
+    if isinstance(values, array):
+        if type(value) is int:
+            try:
+                values.append(value)
+                return
+            except OverflowError:
+                pass
+        col["value"] = values = values.tolist()
+    values.append(value)
+
+
+def write_columnar(events, file, **extra):
+    """Writes events to file as a single-line JSON object, with
+    one group of parallel arrays (step, agent, index, value, sender)
+    per variable. Missing indices and senders are stored as -1.
+    Values that are not integers are written as in write_ndjson.
+    Any extra keyword argument is added to the top-level object.
+    """
+    FIELDS = ("step", "agent", "index", "value", "sender")
+    columns = {}
+    for ev in events:
+        if ev.variable not in columns:
+            columns[ev.variable] = {
+                "store": ev.store,
+                **{f: array("q") for f in FIELDS}}
+        col = columns[ev.variable]
+        col["step"].append(ev.step)
+        col["agent"].append(-1 if ev.agent is None else int(ev.agent))
+        col["index"].append(-1 if ev.index is None else ev.index)
+        _append_value(col, ev.value)
+        col["sender"].append(-1 if ev.sender is None else ev.sender)
+
+    file.write(json.dumps({**extra, "variables": {
+        var: {k: (v.tolist() if isinstance(v, array) else v)
+              for k, v in col.items()}
+        for var, col in columns.items()}}))
+    file.write("\n")
+
+
+TRACE_WRITERS = {
+    "ndjson": write_ndjson,
+    "columnar": write_columnar
+}
@@ -13,24 +13,57 @@ VALUES -- assign values for parameterised specification (key=value)
 """
 
 HELPMSG = {
-    "backend": "Backend to use in verification mode.",
+    "backend": (
+        "Backend to use in verification mode. "
+        "If auto, choose one using the cost model."),
 
     "bitvector": "Enable bitvector optimization where supported.",
 
-    "cores": "Number of CPU cores for parallel analysis.",
+    "cores": (
+        "Number of CPU cores for parallel analysis "
+        "and simulation. With --hosts, the number of "
+        "distributed state space generation workers."),
 
     "debug": "Enable additional checks in the backend.",
 
+    "delta": (
+        "Statistical model checking: probability that the result "
+        "is wrong (1 - confidence)."),
+
+    "epsilon": (
+        "Statistical model checking: precision of the estimate "
+        "(half-width of the indifference region, with --threshold)."),
+
     "lang": "Target language for the code generator.",
 
     "fair": "Enforce fair interleaving of components.",
 
     "from": "Parallel analysis: partition start.",
 
+    "history": (
+        "File where completed verification runs are recorded, "
+        "to calibrate the cost model (empty to disable). "
+        "Once calibrated, runs predicted to far exceed --timeout "
+        "are refused."),
+
+    "hosts": (
+        "Comma-separated list of SSH-reachable hosts where the "
+        "cadp backend runs distributed state space generation "
+        "(--cores workers in total, at least one per host)."),
+
     "keep_files": "Do not remove intermediate files.",
 
     "property": "Property to consider, others will be ignored.",
 
+    "reduce": (
+        "Hide transitions that do not affect the property "
+        "and minimise the state space before verification "
+        "(cadp backend only)."),
+
+    "monitor": (
+        "ATLAS property (always or finally) to check "
+        "on every simulation trace."),
+
     "no-properties": "Ignore all properties.",
 
     "show": "Print emulation program and exit.",
@@ -43,14 +76,33 @@ HELPMSG = {
         "Number of system evolutions. "
         "If 0, generate an unbounded system."),
 
+    "smc": (
+        "Statistical model checking: estimate the probability that "
+        "the property holds within --steps, via random simulation."),
+
     "sync": "Force synchronous stigmergy messages.",
 
+    "threshold": (
+        "Statistical model checking: test whether the probability "
+        "is at least this value, stopping as soon as possible."),
+
     "timeout": (
         "Configure time limit (seconds). "
         "Set to 0 to disable timeout."),
 
     "to": "Parallel analysis: partition end.",
 
+    "trace_file": "Write traces to this file instead of stdout.",
+
+    "trace_store": (
+        "Save simulation traces as compressed trace stores "
+        "in this directory, instead of printing them."),
+
+    "trace_format": (
+        "Format of simulation traces and counterexamples: "
+        "human-readable text, one JSON event per line (ndjson), "
+        "or one JSON object of per-variable arrays per trace (columnar)."),
+
     "verbose": "Print additional messages from the backend."
 }
 
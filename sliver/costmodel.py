@@ -0,0 +1,203 @@
+#!/usr/bin/env python3
+
+"""A pre-flight cost model for choosing a verification strategy.
+
+The size of a problem is estimated from its Info: for unbounded
+strategies, as the (log10 of the) number of states of the encoding;
+for bounded ones, as the size of the unrolled program. Each strategy
+predicts its running time as
+
+    log10(seconds) = a + b * size
+
+with (a, b) initially set to rough defaults and recalibrated by least
+squares from the history of completed runs (one JSON object per line).
+"""
+
+import json
+import logging
+import os
+from collections import namedtuple
+from math import log10
+from pathlib import Path
+
+log = logging.getLogger("costmodel")
+
+Strategy = namedtuple(
+    "Strategy", ["name", "backend", "options", "modalities", "bounded"])
+Estimate = namedtuple("Estimate", ["strategy", "size", "seconds"])
+
+# bounded: True if the strategy needs --steps, False if it cannot
+# use them, None if it works either way
+STRATEGIES = (
+    Strategy(
+        "cadp", "cadp", {},
+        ("always", "fairly", "fairly_inf", "finally"), False),
+    Strategy(
+        "cadp-reduce", "cadp", {"reduce": True},
+        ("always", "fairly", "fairly_inf", "finally"), False),
+    Strategy("cadp-monitor", "cadp-monitor", {}, ("always", "finally"), None),
+)
+# log10_states() is a (loose) upper bound on the reachable states,
+# hence the slope below 1 for explicit-state strategies
+DEFAULT_COEFFICIENTS = {
+    "cadp": (-6.0, 0.5),
+    "cadp-reduce": (-6.3, 0.5),
+    "cadp-monitor": (-5.7, 0.5),
+}
+# Strategies that use the CADP Distributor when --hosts are given
+DISTRIBUTED = ("cadp", "cadp-reduce")
+PARALLEL_EFFICIENCY = 0.7
+# Refuse jobs predicted to take this many times longer than --timeout
+# (only once the strategy has been calibrated)
+REFUSE_FACTOR = 10
+# Minimum number of runs needed to recalibrate a strategy
+MIN_SAMPLES = 3
+
+
+def default_history():
+    """Default run history file, in the user's cache directory.
+    """
+    cache = os.environ.get("XDG_CACHE_HOME") or Path.home() / ".cache"
+    return Path(cache) / "sliver" / "run-history.jsonl"
+
+
+def domain(var, num_agents):
+    """Estimate the number of values that var can take.
+    Initial values underestimate it, so use at least num_agents.
+    """
+    return max(len(var.values), num_agents, 2)
+
+
+def log10_states(info):
+    """Estimate log10 of the number of states of the system.
+
+    Counts the environment, the interface of each agent, and for each
+    stigmergic variable its value, its timestamp and the pending
+    propagation/confirmation flag of its owner.
+    """
+    n = info.spawn.num_agents()
+    result = sum(v.size * log10(domain(v, n)) for v in info.e.values())
+    for (lo, hi), agent in info.spawn.items():
+        per_agent = sum(
+            v.size * log10(domain(v, n)) for v in agent.iface.values())
+        per_agent += sum(
+            v.size * (log10(domain(v, n)) + log10(max(n, 2)) + log10(4))
+            for v in agent.lstig.values())
+        result += (hi - lo) * per_agent
+    return result
+
+
+def program_size(info, steps):
+    """Estimate log10 of the size of a program unrolled steps times.
+    """
+    num_vars = (
+        sum(v.size for v in info.e.values()) +
+        sum((hi - lo) * sum(v.size for v in (*a.iface.values(), *a.lstig.values()))  # noqa: E501
+            for (lo, hi), a in info.spawn.items()))
+    return log10(max(steps, 1) * max(num_vars, 1))
+
+
+def fit(points, default):
+    """Fit log10(seconds) = a + b * size by least squares.
+    If all points have the same size, keep the default slope.
+    """
+    n = len(points)
+    mean_x = sum(x for x, _ in points) / n
+    mean_y = sum(y for _, y in points) / n
+    var_x = sum((x - mean_x) ** 2 for x, _ in points)
+    if var_x < 1e-9:
+        b = default[1]
+    else:
+        b = sum((x - mean_x) * (y - mean_y) for x, y in points) / var_x
+    return mean_y - b * mean_x, b
+
+
+class CostModel:
+    """Predicts the cost of verification strategies, optionally
+    calibrated from (and recording into) a run history file.
+    """
+    def __init__(self, history=None):
+        self.history = history
+        self.coefficients = dict(DEFAULT_COEFFICIENTS)
+        # strategies whose coefficients were fitted on actual runs
+        self.calibrated = set()
+        if history:
+            try:
+                with open(history) as f:
+                    self.calibrate(json.loads(line) for line in f if line.strip())  # noqa: E501
+            except FileNotFoundError:
+                pass
+
+    def calibrate(self, records):
+        """Refit the coefficients of each strategy with at least
+        MIN_SAMPLES completed runs in records.
+        """
+        points = {}
+        for r in records:
+            if r.get("strategy") in self.coefficients and r["seconds"] > 0:
+                points.setdefault(r["strategy"], []).append(
+                    (r["size"], log10(r["seconds"])))
+        for name, pts in points.items():
+            if len(pts) >= MIN_SAMPLES:
+                self.coefficients[name] = fit(pts, DEFAULT_COEFFICIENTS[name])  # noqa: E501
+                self.calibrated.add(name)
+                log.debug(f"Calibrated {name}: {self.coefficients[name]}")
+
+    def estimate(self, info, strategy, steps=0, workers=1):
+        """Predicts the cost of checking info with strategy, where
+        workers is the number of distributed state space generation
+        workers (1 if the state space is not distributed).
+        """
+        size = (
+            program_size(info, steps) if strategy.bounded
+            else log10_states(info))
+        a, b = self.coefficients[strategy.name]
+        # Avoid overflows on hopeless instances
+        seconds = 10 ** min(a + b * size, 300)
+        if workers > 1 and strategy.name in DISTRIBUTED:
+            seconds /= workers ** PARALLEL_EFFICIENCY
+        return Estimate(strategy, size, seconds)
+
+    def candidates(self, info, steps=0):
+        """Yields the strategies that can check info's first property.
+        """
+        modality = info.properties[0].split()[0]
+        for s in STRATEGIES:
+            if modality in s.modalities and s.bounded in (None, steps > 0):
+                yield s
+
+    def choose(self, info, steps=0, workers=1):
+        """Returns the estimate of the cheapest strategy
+        (None if no strategy supports the property).
+        """
+        estimates = [
+            self.estimate(info, s, steps, workers)
+            for s in self.candidates(info, steps)]
+        for e in estimates:
+            log.debug(f"{e.strategy.name}: size {e.size:.1f}, ~{e.seconds:.3g}s")  # noqa: E501
+        return min(estimates, key=lambda e: e.seconds, default=None)
+
+    def record(self, estimate, seconds, status):
+        """Appends a completed run to the history.
+        """
+        if not self.history:
+            return
+        try:
+            Path(self.history).parent.mkdir(parents=True, exist_ok=True)
+            with open(self.history, "a") as f:
+                f.write(json.dumps({
+                    "strategy": estimate.strategy.name,
+                    "size": estimate.size,
+                    "predicted": estimate.seconds,
+                    "seconds": seconds,
+                    "status": status}) + "\n")
+        except OSError as e:
+            log.warning(f"Cannot record run in {self.history}: {e}")
+
+
+def strategy_for(backend, kwargs):
+    """Returns the strategy corresponding to a backend and
+    its options (None if the cost model does not know it).
+    """
+    name = f"{backend}-reduce" if kwargs.get("reduce") else backend
+    return next((s for s in STRATEGIES if s.name == name), None)
@@ -3,8 +3,11 @@
 """Functions and classes to obtain and represent structured information
 about a LAbS system
 """
-from random import choice
+from array import array
 from ast import NodeVisitor, parse
+from functools import cached_property
+from math import prod
+from random import choice, Random
 
 
 class LabsExprVisitor(NodeVisitor):
@@ -62,28 +65,49 @@ class LabsExprVisitor(NodeVisitor):
 
 
 class Info(object):
+    """Structured information about a LAbS system.
+
+    Stores (e, i, lstig) are only built when first accessed,
+    so that e.g. looking at the properties does not require
+    parsing every variable in the system. Until then, e is kept
+    as text (";"-separated "index=name=init" specifications).
+    """
     def __init__(self, spawn, e, props, raw=""):
         self.spawn = spawn
-        self.i = {}
-        self.lstig = {}
         self.properties = tuple(p for p in props.split(";") if p)
-        for c in spawn.values():
-            self.i.update(c.iface)
-            self.lstig.update(c.lstig)
-        self.e = {i: v for i, v in enumerate(e)}
+        self._e = e
         self.raw = raw
 
+    @cached_property
+    def e(self):
+        specs = (v for v in self._e.split(";") if v)
+        return {i: Variable(*v.split("=")) for i, v in enumerate(specs)}
+
+    @cached_property
+    def i(self):
+        result = {}
+        for c in self.spawn.values():
+            result.update(c.iface)
+        return result
+
+    @cached_property
+    def lstig(self):
+        result = {}
+        for c in self.spawn.values():
+            result.update(c.lstig)
+        return result
+
     @staticmethod
     def parse(txt):
-        if not txt:
-            raise ValueError("empty info")
         """Deserialize system info
         """
+        if not txt:
+            raise ValueError("empty info")
         lines = txt.split("|")
         envs, comps, props = lines[0], lines[1:-1], lines[-1]
         return Info(
             spawn=Spawn.parse(comps),
-            e=[Variable(*v.split("=")) for v in envs.split(";") if v],
+            e=envs,
             props=props,
             raw=txt)
 
@@ -104,6 +128,55 @@ class Info(object):
             return match
         raise KeyError
 
+    def store(self, where):
+        """Returns the store called where ("E", "I", or "L")
+        """
+        return {"E": self.e, "I": self.i, "L": self.lstig}[where]
+
+    @cached_property
+    def elements(self):
+        """Maps (store, key) to the variable name, array index (None for
+        scalars) and display name (e.g. "pos[3]") of every element
+        of every store.
+        """
+        result = {}
+        for where in ("E", "I", "L"):
+            for v in self.store(where).values():
+                for i in range(v.size):
+                    result[where, v.index + i] = (
+                        (v.name, i, f"{v.name}[{i}]") if v.is_array
+                        else (v.name, None, v.name))
+        return result
+
+    @cached_property
+    def assign_prefixes(self):
+        """Maps (store, key) to the text that precedes the value
+        in a pretty-printed assignment, e.g. "x <- "
+        """
+        arrows = {"E": "<--", "I": "<-", "L": "<~"}
+        return {
+            (where, key): f"{display} {arrows[where]} "
+            for (where, key), (_, _, display) in self.elements.items()}
+
+    @cached_property
+    def agent_labels(self):
+        """agent_labels[tid] is the label of agent tid, e.g. "Bird 3"
+        """
+        labels = [None] * self.spawn.num_agents()
+        for (low, up), agent in self.spawn.items():
+            for tid in range(low, up):
+                labels[tid] = f"{agent} {tid}"
+        return tuple(labels)
+
+    def resolve_var(self, where, key):
+        """Returns the name of the variable at position key of store where,
+        and its array index (None for scalar variables).
+        """
+        try:
+            return self.elements[where, key][:2]
+        except KeyError:
+            raise KeyError("Out of bounds")
+
     def pprint_var(self, store, key):
         v = get_var(store, key)
         if v.is_array:
@@ -112,39 +185,174 @@ class Info(object):
             return v.name
 
     def pprint_assign(self, where, key, value):
-        store, arrow = {
-            "E": (self.e, "<--"),
-            "I": (self.i, "<-"),
-            "L": (self.lstig, "<~")}[where]
-        return "{} {} {}".format(self.pprint_var(store, key), arrow, value) \
-               if store else ""
+        try:
+            return f"{self.assign_prefixes[where, key]}{value}"
+        except KeyError:
+            if self.store(where):
+                raise KeyError("Out of bounds")
+            return ""
+
+    def instrument_layout(self):
+        """Yields (location, index, variable) for every element of the
+        initial state, in the order used by instrument(). Indices follow
+        StateLayout, i.e., the per-agent sizes of the whole system.
+        """
+        layout = StateLayout(self)
+        for x in self.e.values():
+            for i in range(x.size):
+                yield "E", x.index + i, x
+        for (low, up), agent in self.spawn.items():
+            for n in range(low, up):
+                for x in agent.iface.values():
+                    for i in range(x.size):
+                        yield "I", n * layout.i_size + x.index + i, x
+            for n in range(low, up):
+                for x in agent.lstig.values():
+                    for i in range(x.size):
+                        yield "Lvalue", n * layout.l_size + x.index + i, x
 
     def instrument(self):
-        def format(fmt, var, index):
-            return ",".join(
-                fmt.format(TYPE, index + i, var.rnd_value())
-                for i in range(var.size))
-
-        def fmt(location, var, offset=0):
-            return [
-                (TYPE, location, offset + var.index + i, var.rnd_value())
-                for i in range(var.size)
-            ]
-
-        TYPE = "short"
-        out = [fmt("E", x) for x in self.e.values()]
-        for (low, up), agent in self.spawn.items():
-            i_length = len(agent.iface)
-            out.extend(
-                fmt("I", x, n * i_length)
-                for n in range(low, up)
-                for x in agent.iface.values())
-            out.extend(
-                fmt("Lvalue", x, n * i_length)
-                for n in range(low, up)
-                for x in agent.lstig.values())
-        # Return the flattened list
-        return (x for lst in out for x in lst)
+        """Yields (type, location, index, value) tuples describing
+        one random initial state.
+        """
+        return (
+            (InitialStates.TYPE, location, index, var.rnd_value())
+            for location, index, var in self.instrument_layout())
+
+    def instrument_batch(self, k, seed=None, unique=False):
+        """Returns k random initial states as an InitialStates matrix.
+
+        Values are drawn from each variable's domain by a dedicated
+        random generator seeded with seed, so that batches are
+        reproducible. If unique is True, no state appears twice.
+        """
+        layout = StateLayout(self)
+        elements = tuple(self.instrument_layout())
+        rng = Random(seed)
+        if unique and k > prod(len(v.values) for _, _, v in elements):
+            raise ValueError(f"Cannot generate {k} distinct initial states")
+        data = [
+            array("h", rng.choices(var.values, k=k))
+            for _, _, var in elements]
+        base = {"E": 0, "I": layout.i_base, "Lvalue": layout.l_base}
+        states = InitialStates(
+            tuple((loc, index) for loc, index, _ in elements),
+            tuple(base[loc] + index for loc, index, _ in elements),
+            layout.size, data)
+        if unique:
+            states.deduplicate(
+                lambda: tuple(rng.choice(v.values) for _, _, v in elements))
+        return states
+
+
+class InitialStates:
+    """A batch of initial states, stored column-wise:
+    columns[j] is the (location, index) of the j-th state element,
+    positions[j] its position in a StateLayout of the given size,
+    and data[j] holds its value in every state of the batch.
+    """
+    TYPE = "short"
+
+    def __init__(self, columns, positions, size, data):
+        self.columns = columns
+        self.positions = positions
+        self.size = size
+        self.data = data
+
+    def __len__(self):
+        return len(self.data[0]) if self.data else 0
+
+    def __getitem__(self, n):
+        """states[n] returns the n-th state as a tuple of values
+        """
+        return tuple(col[n] for col in self.data)
+
+    def __iter__(self):
+        return zip(*self.data) if self.data else iter(())
+
+    def deduplicate(self, fresh):
+        """Replaces duplicate states with new ones obtained by
+        calling fresh(), until all states are distinct.
+        """
+        seen = set()
+        for n, state in enumerate(self):
+            while state in seen:
+                state = fresh()
+                for col, value in zip(self.data, state):
+                    col[n] = value
+            seen.add(state)
+
+    def state(self, n):
+        """Returns the n-th state as a flat array laid out
+        as in StateLayout (see replay.Replay)
+        """
+        result = array("i", bytes(4 * self.size))
+        for pos, col in zip(self.positions, self.data):
+            result[pos] = col[n]
+        return result
+
+    def instrument(self, n):
+        """Yields the n-th state as (type, location, index, value) tuples,
+        like Info.instrument()
+        """
+        return (
+            (self.TYPE, loc, index, value)
+            for (loc, index), value in zip(self.columns, self[n]))
+
+
+class StateLayout:
+    """Maps every element of the system state (the environment, plus
+    the interface and stigmergy of every agent) to a position
+    in a flat array.
+    """
+
+    def __init__(self, info):
+        def store_size(store):
+            return max((v.index + v.size for v in store.values()), default=0)
+
+        self.num_agents = info.spawn.num_agents()
+        self.e_size = store_size(info.e)
+        self.i_size = store_size(info.i)
+        self.l_size = store_size(info.lstig)
+        self.i_base = self.e_size
+        self.l_base = self.i_base + self.num_agents * self.i_size
+        self.size = self.l_base + self.num_agents * self.l_size
+        self._keys = {
+            (where, v.name): v.index
+            for where in ("E", "I", "L")
+            for v in info.store(where).values()}
+
+    def offset(self, where, agent, key):
+        """Returns the position of element key in store where
+        ("E", "I", or "L") of the given agent.
+        """
+        if where == "E":
+            return key
+        elif where == "I":
+            return self.i_base + agent * self.i_size + key
+        else:
+            return self.l_base + agent * self.l_size + key
+
+    def event_offset(self, ev):
+        """Returns the position of the element assigned by an Event
+        """
+        key = self._keys[(ev.store, ev.variable)] + (ev.index or 0)
+        return self.offset(ev.store, int(ev.agent or 0), key)
+
+    @staticmethod
+    def event_value(ev):
+        """Returns the value assigned by an Event, as an element of
+        the flat state: booleans are stored as 0 and 1, integers as
+        they are. Anything else (e.g., a record) cannot be stored.
+        """
+        value = ev.value
+        if type(value) is bool:
+            return int(value)
+        if type(value) is int and -2**31 <= value < 2**31:
+            return value
+        raise ValueError(
+            f"Cannot store value {value!r} of {ev.variable}: "
+            "states only hold booleans and 32-bit integers")
 
 
 class Spawn:
@@ -257,23 +465,32 @@ def get_var(lst, index):
 
 
 class Agent:
+    """An agent type. Its interface and stigmergy variables are
+    parsed on first access.
+    """
 
     def __init__(self, name, iface, lstig):
         self.name = name
-        self.iface = {}
-        self.lstig = {}
+        self._iface = iface
+        self._lstig = lstig
 
-        if iface != "":
-            for txt in iface.split(";"):
-                splitted = txt.split("=")
+    @staticmethod
+    def _parse_store(txt, store):
+        result = {}
+        if txt != "":
+            for var in txt.split(";"):
+                splitted = var.split("=")
                 index, text = splitted[0], splitted[1:]
-                self.iface[int(index)] = Variable(int(index), *text, store="i")
+                result[int(index)] = Variable(int(index), *text, store=store)
+        return result
 
-        if lstig != "":
-            for txt in lstig.split(";"):
-                splitted = txt.split("=")
-                index, text = splitted[0], splitted[1:]
-                self.lstig[int(index)] = Variable(int(index), *text, store="lstig")  # noqa: E501
+    @cached_property
+    def iface(self):
+        return self._parse_store(self._iface, "i")
+
+    @cached_property
+    def lstig(self):
+        return self._parse_store(self._lstig, "lstig")
 
     def __str__(self):
         return self.name
@@ -0,0 +1,32 @@
+#!/usr/bin/env python3
+
+"""Checks an ATLAS property over archived trace stores,
+without recompiling the system.
+
+Usage: ./monitor.py PROPERTY TRACE...
+"""
+import sys
+
+from atlas.monitor import Monitor
+from tracestore import TraceReader
+
+
+def check_stores(prop, paths):
+    """Prints the verdict of prop on each trace store in paths.
+    Returns the number of traces that violate prop.
+    """
+    violations = 0
+    for path in paths:
+        with TraceReader(path) as reader:
+            monitor = Monitor(reader.info, prop)
+            verdict = monitor.check(reader.states())
+        violations += not verdict.holds
+        print(f"{path}: {monitor.describe(verdict)}")
+    return violations
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 3:
+        print(__doc__)
+        sys.exit(2)
+    sys.exit(1 if check_stores(sys.argv[1], sys.argv[2:]) else 0)
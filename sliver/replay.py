@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+
+"""Reconstruction of system states from translated traces.
+"""
+from array import array
+from collections import namedtuple
+
+from info import StateLayout
+
+# data[step * len(agents) + n] is the value for agents[n] after step
+TimeSeries = namedtuple("TimeSeries", ["variable", "agents", "data"])
+
+
+class Replay:
+    """Replays trace events (see cex.Event) over a preallocated flat
+    system state, laid out according to StateLayout.
+
+    The state is updated in place: views returned by run() always
+    reflect the latest applied event, so callers that need to keep
+    a snapshot must copy it.
+    """
+
+    def __init__(self, info):
+        self.info = info
+        self.layout = StateLayout(info)
+        self.state = array("i", bytes(4 * self.layout.size))
+        self.view = memoryview(self.state).toreadonly()
+        self.step = 0
+
+    def apply(self, ev):
+        """Applies a single event to the current state. Raises a
+        ValueError if its value cannot be stored (see StateLayout).
+        """
+        self.state[self.layout.event_offset(ev)] = self.layout.event_value(ev)
+        self.step = ev.step
+
+    def push(self, ev):
+        """Applies a single event, after yielding (step, state) for
+        every step that it completes.
+        """
+        while ev.step > self.step:
+            yield self.step, self.view
+            self.step += 1
+        self.apply(ev)
+
+    def run(self, events):
+        """Applies events and yields (step, state) after every step.
+        state is a read-only view over the live state.
+        """
+        for ev in events:
+            yield from self.push(ev)
+        yield self.step, self.view
+
+    def agents(self, variable):
+        """Returns the ids of agents that own variable
+        (None for environment variables).
+        """
+        if any(v.name == variable for v in self.info.e.values()):
+            return (None, )
+        return tuple(
+            tid
+            for (low, up), agent in self.info.spawn.items()
+            if any(v.name == variable for v in (
+                *agent.iface.values(), *agent.lstig.values()))
+            for tid in range(low, up))
+
+    def positions(self, variable, index=None):
+        """Returns the positions in the state of (element index of)
+        variable, one per agent in self.agents(variable).
+        """
+        var = self.info.lookup_var(variable)
+        where = {"e": "E", "i": "I", "lstig": "L"}[var.store]
+        key = var.index + (index or 0)
+        return tuple(
+            self.layout.offset(where, agent, key)
+            for agent in self.agents(variable))
+
+    def value(self, variable, agent=None, index=None):
+        """Returns the current value of variable for the given agent
+        """
+        var = self.info.lookup_var(variable)
+        where = {"e": "E", "i": "I", "lstig": "L"}[var.store]
+        return self.state[self.layout.offset(
+            where, agent or 0, var.index + (index or 0))]
+
+    def series(self, events, variable, index=None):
+        """Replays events and returns the value of variable (or of its
+        element index) for every agent at every step, as a TimeSeries.
+        Only the requested elements are copied at each step.
+        """
+        positions = self.positions(variable, index)
+        data = array("i")
+        state = self.state
+        for _ in self.run(events):
+            data.extend(state[p] for p in positions)
+        return TimeSeries(variable, self.agents(variable), data)
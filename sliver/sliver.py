@@ -3,12 +3,14 @@ import logging
 import sys
 from subprocess import CalledProcessError
 from pathlib import Path
+from time import perf_counter
 
 import click
 
 from info import Info
 from cli import DEFAULTS
 from backends import ALL_BACKENDS, ExitStatus
+from costmodel import CostModel, REFUSE_FACTOR, default_history, strategy_for
 from __about__ import __title__, __version__
 
 __DIR = Path(__file__).parent.resolve()
@@ -20,19 +22,31 @@ log = logging.getLogger("sliver")
 @click.argument('file', required=True, type=click.Path(exists=True))
 @click.argument('values', nargs=-1)
 @click.option('--backend', "backend_arg",
-              type=click.Choice(tuple(ALL_BACKENDS.keys())),
+              type=click.Choice((*ALL_BACKENDS.keys(), "auto")),
               default="cadp", **DEFAULTS("backend"))
+@click.option('--cores', **DEFAULTS("cores", default=1, type=int))
 @click.option('--debug', **DEFAULTS("debug", default=False, is_flag=True))
+@click.option('--delta', **DEFAULTS("delta", default=0.05, type=click.FloatRange(0, 1, min_open=True, max_open=True)))  # noqa: E501
+@click.option('--epsilon', **DEFAULTS("epsilon", default=0.01, type=click.FloatRange(0, 1, min_open=True, max_open=True)))  # noqa: E501
 @click.option('--fair/--no-fair', **DEFAULTS("fair", default=False))
+@click.option('--history', **DEFAULTS("history", default=str(default_history()), type=click.Path(dir_okay=False)))  # noqa: E501
+@click.option('--hosts', **DEFAULTS("hosts"))
 @click.option('--simulate', **DEFAULTS("simulate", default=0, type=int))
 @click.option('--show', **DEFAULTS("show", default=False, is_flag=True))
+@click.option('--smc', **DEFAULTS("smc", default=False, is_flag=True))
 @click.option('--steps', **DEFAULTS("steps", default=0, type=int))
+@click.option('--threshold', **DEFAULTS("threshold", type=click.FloatRange(0, 1)))  # noqa: E501
 @click.option('--timeout', **DEFAULTS("timeout", default=0, type=int))
 @click.option('--verbose', **DEFAULTS("verbose", default=False, is_flag=True))
+@click.option('--monitor', **DEFAULTS("monitor"))
 @click.option('--no-properties', **DEFAULTS("no-properties", default=False, is_flag=True))  # noqa: E501
 @click.option('--property', **DEFAULTS("property"))
+@click.option('--reduce', **DEFAULTS("reduce", default=False, is_flag=True))
 @click.option('--keep-files', **DEFAULTS("keep_files", default=False, is_flag=True))  # noqa: E501
-def main(file, backend_arg, simulate, show, **kwargs):
+@click.option('--trace-format', type=click.Choice(("text", "ndjson", "columnar")), **DEFAULTS("trace_format", default="text"))  # noqa: E501
+@click.option('--trace-file', **DEFAULTS("trace_file", type=click.Path(dir_okay=False)))  # noqa: E501
+@click.option('--trace-store', **DEFAULTS("trace_store", type=click.Path(file_okay=False)))  # noqa: E501
+def main(file, backend_arg, simulate, show, smc, **kwargs):
     """\b
 * * *  The SLiVER LAbS VERification tool. v2.0 (October 2021) * * *
 
@@ -40,7 +54,7 @@ FILE -- path of LABS file to analyze
 
 VALUES -- assign values for parameterised specification (key=value)
 """
-    if simulate and kwargs.get("steps", 0) == 0:
+    if (simulate or smc) and kwargs.get("steps", 0) == 0:
         print("Must specify the length of simulation traces (--steps)")
         sys.exit(ExitStatus.INVALID_ARGS.value)
 
@@ -52,10 +66,34 @@ VALUES -- assign values for parameterised specification (key=value)
     log.info("Encoding...")
 
     sprint_kwargs = ", ".join(f"{k}={v}" for k, v in kwargs.items())
-    log.debug(f"CLI options: {backend_arg=}, {simulate=}, {show=}, {sprint_kwargs}")  # noqa: E501
+    log.debug(f"CLI options: {backend_arg=}, {simulate=}, {show=}, {smc=}, {sprint_kwargs}")  # noqa: E501
+    cost_model = CostModel(kwargs["history"])
+    # State space generation is only distributed with --hosts
+    workers = kwargs["cores"] if kwargs.get("hosts") else 1
+    info_raw = None
+    if backend_arg == "auto":
+        backend_arg = "cadp-monitor" if smc else "cadp"
+        if not (simulate or show or smc):
+            try:
+                info_raw = ALL_BACKENDS[backend_arg](
+                    __DIR, **kwargs).gather_info(file)
+            except CalledProcessError as e:
+                log.error(e.stderr.decode())
+                print(ExitStatus.format(ExitStatus.PARSING_ERROR))
+                sys.exit(ExitStatus.PARSING_ERROR.value)
+            info = parse_info(info_raw)
+            estimate = (
+                cost_model.choose(info, kwargs["steps"], workers)
+                if info.properties else None)
+            if estimate:
+                strategy = estimate.strategy
+                log.info(f"Selected strategy {strategy.name} (predicted: {estimate.seconds:.3g}s)")  # noqa: E501
+                backend_arg = strategy.backend
+                kwargs.update(strategy.options)
     backend = ALL_BACKENDS[backend_arg](__DIR, **kwargs)
     try:
-        fname, info = backend.generate_code(file, simulate, show)
+        fname, info = backend.generate_code(
+            file, simulate or smc, show, info=info_raw)
     except CalledProcessError as e:
         log.debug(e)
         err_msg = e.stderr.decode()
@@ -67,24 +105,47 @@ VALUES -- assign values for parameterised specification (key=value)
         sys.exit(sliver_return.value)
     if fname and show:
         sys.exit(ExitStatus.SUCCESS.value)
-    info = info.replace("\n", "|")[:-1]
-    log.debug(f"{info=}")
-    info = Info.parse(info)
+    info = parse_info(info)
     status = None
+    strategy = strategy_for(backend_arg, kwargs)
+    estimate = None
+    if strategy and not (simulate or smc) and info.properties:
+        estimate = cost_model.estimate(
+            info, strategy, kwargs["steps"], workers)
+        log.debug(f"Predicted cost: {estimate.seconds:.3g}s")
+        timeout = kwargs.get("timeout", 0)
+        # Uncalibrated estimates are too rough to refuse a run
+        if (timeout > 0 and strategy.name in cost_model.calibrated and
+                estimate.seconds > REFUSE_FACTOR * timeout):
+            log.error(
+                f"Predicted running time ({estimate.seconds:.3g}s) "
+                f"far exceeds the timeout ({timeout}s), refusing to start. "
+                "Raise --timeout or set it to 0 to run anyway.")
+            backend.cleanup(fname)
+            print(ExitStatus.format(ExitStatus.INVALID_ARGS, simulate))
+            sys.exit(ExitStatus.INVALID_ARGS.value)
     if fname:
         try:
             status = (
-                ExitStatus.SUCCESS if simulate
+                ExitStatus.SUCCESS if simulate or smc
                 else backend.check_property_support(info))
             if status != ExitStatus.SUCCESS:
                 sys.exit(status.value)
 
-            sim_or_verify = "Running simulation" if simulate else "Verifying"
+            sim_or_verify = (
+                "Running simulation" if simulate else
+                "Running statistical model checking" if smc else
+                "Verifying")
             if not simulate and kwargs.get("property"):
                 sim_or_verify += f""" '{kwargs.get("property")}'"""
             log.info(f"{sim_or_verify} with backend {backend_arg}...")
-            status = (backend.simulate(fname, info, simulate) if simulate else
-                      backend.verify(fname, info))
+            start = perf_counter()
+            status = (
+                backend.simulate(fname, info, simulate) if simulate else
+                backend.smc(fname, info) if smc else
+                backend.verify(fname, info))
+            if estimate and status in (ExitStatus.SUCCESS, ExitStatus.FAILED):
+                cost_model.record(estimate, perf_counter() - start, status.name)  # noqa: E501
         except KeyboardInterrupt:
             status = ExitStatus.KILLED
         finally:
@@ -97,5 +158,11 @@ VALUES -- assign values for parameterised specification (key=value)
                 sys.exit(status.value)
 
 
+def parse_info(raw):
+    info = raw.replace("\n", "|")[:-1]
+    log.debug(f"{info=}")
+    return Info.parse(info)
+
+
 if __name__ == "__main__":
     main()
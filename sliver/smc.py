@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+
+"""Statistical model checking: estimating the probability that a
+property holds, or testing it against a threshold, from a sequence of
+independent samples (one per random simulation trace).
+"""
+from collections import namedtuple
+from math import ceil, log, sqrt
+from statistics import NormalDist
+
+# decision: None for estimation; otherwise True if the hypothesis
+# "p >= threshold" was accepted, False if it was rejected
+Result = namedtuple(
+    "Result",
+    ["samples", "successes", "estimate", "low", "high", "decision"])
+
+
+def chernoff_samples(epsilon, delta):
+    """Number of samples such that the estimate is within epsilon of
+    the true probability with confidence 1 - delta
+    (Okamoto's bound, from the Chernoff-Hoeffding inequality).
+    """
+    return ceil(log(2 / delta) / (2 * epsilon ** 2))
+
+
+def wilson_interval(successes, samples, delta):
+    """Wilson score interval with confidence 1 - delta.
+    """
+    if samples == 0:
+        return 0.0, 1.0
+    z = NormalDist().inv_cdf(1 - delta / 2)
+    p = successes / samples
+    denominator = 1 + z ** 2 / samples
+    center = (p + z ** 2 / (2 * samples)) / denominator
+    half = z * sqrt(
+        p * (1 - p) / samples + z ** 2 / (4 * samples ** 2)) / denominator
+    return max(0.0, center - half), min(1.0, center + half)
+
+
+class Estimation:
+    """Estimates the probability p that the property holds, with
+    |estimate - p| <= epsilon with confidence 1 - delta.
+    """
+    def __init__(self, epsilon, delta):
+        self.delta = delta
+        self.max_samples = chernoff_samples(epsilon, delta)
+        self.samples = self.successes = 0
+
+    def add(self, success):
+        self.samples += 1
+        self.successes += bool(success)
+
+    @property
+    def done(self):
+        return self.samples >= self.max_samples
+
+    def result(self):
+        low, high = wilson_interval(self.successes, self.samples, self.delta)
+        estimate = self.successes / self.samples if self.samples else 0.0
+        return Result(
+            self.samples, self.successes, estimate, low, high, None)
+
+
+class SPRT(Estimation):
+    """Wald's sequential probability ratio test of
+    H0: p >= threshold + epsilon against H1: p <= threshold - epsilon,
+    with type I and type II errors bounded by delta.
+
+    If the test has not terminated after the number of samples
+    needed for estimation, the estimate decides.
+    """
+    def __init__(self, threshold, epsilon, delta):
+        super().__init__(epsilon, delta)
+        self.threshold = threshold
+        p0 = min(threshold + epsilon, 1 - 1e-9)
+        p1 = max(threshold - epsilon, 1e-9)
+        self.accept_h1 = log((1 - delta) / delta)
+        self.accept_h0 = log(delta / (1 - delta))
+        self._success = log(p1 / p0)
+        self._failure = log((1 - p1) / (1 - p0))
+        self.ratio = 0.0
+
+    def add(self, success):
+        super().add(success)
+        self.ratio += self._success if success else self._failure
+
+    @property
+    def done(self):
+        return (
+            not (self.accept_h0 < self.ratio < self.accept_h1) or
+            super().done)
+
+    def result(self):
+        result = super().result()
+        if self.ratio <= self.accept_h0:
+            decision = True
+        elif self.ratio >= self.accept_h1:
+            decision = False
+        else:
+            decision = result.estimate >= self.threshold
+        return result._replace(decision=decision)
@@ -0,0 +1,217 @@
+#!/usr/bin/env python3
+
+"""A compact, compressed file format for traces, with constant-time
+access to the system state at any step.
+
+A trace store holds the initial state and, for every subsequent step,
+the elements of the state that the step changed. Every `interval` steps
+it also holds a snapshot of the full state. Snapshots and deltas are
+grouped in independently compressed blocks (one block per snapshot),
+and an index of block offsets at the end of the file points to each.
+Reading step k only requires decompressing block k // interval and
+applying at most interval - 1 deltas.
+
+File layout (little-endian):
+    MAGIC | u32 n | n bytes of JSON metadata | block* | u64 offsets* |
+    u64 index position | u64 number of steps
+Block layout (zlib-compressed):
+    u32 steps | u32 deltas | i32 snapshot[size] | u32 count[steps - 1] |
+    u32 position[deltas] | i32 value[deltas]
+"""
+
+import json
+import mmap
+import struct
+import zlib
+from array import array
+
+from info import Info, StateLayout
+
+MAGIC = b"SLVTRC01"
+FOOTER = struct.Struct("<QQ")
+U32 = struct.Struct("<I")
+BLOCK_HEADER = struct.Struct("<II")
+
+
+class TraceWriter:
+    """Writes a trace store to path.
+
+    Events (see cex.Event) must be given in step order;
+    step 0 is the initialization.
+    """
+
+    def __init__(self, path, info, interval=1024):
+        self.layout = StateLayout(info)
+        self.interval = interval
+        self.file = open(path, "wb")
+        self.state = array("i", bytes(4 * self.layout.size))
+        self.offsets = array("Q")
+        self.step = 0
+        self._new_block()
+        meta = json.dumps({
+            "info": info.raw, "interval": interval,
+            "size": self.layout.size}).encode()
+        self.file.write(MAGIC)
+        self.file.write(U32.pack(len(meta)))
+        self.file.write(meta)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def _new_block(self):
+        self.block_steps = 0
+        self.counts = array("I")
+        self.positions = array("I")
+        self.values = array("i")
+        self.step_deltas = 0
+
+    def _flush_block(self):
+        if self.block_steps == 0:
+            return
+        data = b"".join((
+            BLOCK_HEADER.pack(self.block_steps, len(self.positions)),
+            self.snapshot, self.counts.tobytes(),
+            self.positions.tobytes(), self.values.tobytes()))
+        self.offsets.append(self.file.tell())
+        self.file.write(zlib.compress(data))
+        self._new_block()
+
+    def _end_step(self):
+        if self.step % self.interval == 0:
+            # Changes made in this step are part of the new snapshot
+            del self.positions[len(self.positions) - self.step_deltas:]
+            del self.values[len(self.values) - self.step_deltas:]
+            self._flush_block()
+            self.snapshot = self.state.tobytes()
+        else:
+            self.counts.append(self.step_deltas)
+        self.block_steps += 1
+        self.step_deltas = 0
+        self.step += 1
+
+    def write(self, events):
+        """Appends events to the trace.
+        """
+        for ev in events:
+            while ev.step > self.step:
+                self._end_step()
+            pos = self.layout.event_offset(ev)
+            value = self.layout.event_value(ev)
+            self.state[pos] = value
+            self.positions.append(pos)
+            self.values.append(value)
+            self.step_deltas += 1
+
+    def close(self):
+        if self.file.closed:
+            return
+        self._end_step()
+        self._flush_block()
+        self.offsets.append(self.file.tell())
+        index = self.file.tell()
+        self.file.write(self.offsets.tobytes())
+        self.file.write(FOOTER.pack(index, self.step))
+        self.file.close()
+
+
+class TraceReader:
+    """Reads a trace store through mmap.
+
+    len(reader) is the number of steps, reader[k] (or reader.state(k))
+    the full system state after step k as a flat array, laid out
+    according to reader.layout.
+    """
+
+    def __init__(self, path):
+        with open(path, "rb") as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._mm[:len(MAGIC)] != MAGIC:
+            raise ValueError(f"{path} is not a trace store")
+        pos = len(MAGIC)
+        meta_len, = U32.unpack_from(self._mm, pos)
+        pos += U32.size
+        self.meta = json.loads(self._mm[pos:pos + meta_len])
+        self.interval = self.meta["interval"]
+        index, self.steps = FOOTER.unpack_from(
+            self._mm, len(self._mm) - FOOTER.size)
+        self._offsets = memoryview(self._mm)[
+            index:len(self._mm) - FOOTER.size].cast("Q")
+        self._cached = None, None
+        self._info = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def close(self):
+        self._offsets.release()
+        self._mm.close()
+
+    def __len__(self):
+        return self.steps
+
+    def __getitem__(self, k):
+        return self.state(k)
+
+    @property
+    def info(self):
+        if self._info is None:
+            self._info = Info.parse(self.meta["info"])
+        return self._info
+
+    @property
+    def layout(self):
+        return StateLayout(self.info)
+
+    def _block(self, b):
+        if self._cached[0] != b:
+            data = zlib.decompress(
+                self._mm[self._offsets[b]:self._offsets[b + 1]])
+            steps, deltas = BLOCK_HEADER.unpack_from(data)
+            pos = BLOCK_HEADER.size
+            arrays = []
+            for typecode, length in (
+                    ("i", self.meta["size"]), ("I", steps - 1),
+                    ("I", deltas), ("i", deltas)):
+                arr = array(typecode)
+                arr.frombytes(data[pos:pos + 4 * length])
+                arrays.append(arr)
+                pos += 4 * length
+            self._cached = b, arrays
+        return self._cached[1]
+
+    def states(self):
+        """Yields (k, state) for every step k in order, applying each
+        delta once. state is updated in place between steps, so
+        callers that need to keep it must copy it.
+        """
+        for b in range(-(-self.steps // self.interval)):
+            snapshot, counts, positions, values = self._block(b)
+            state = array("i", snapshot)
+            k, i = b * self.interval, 0
+            yield k, state
+            for count in counts:
+                for j in range(i, i + count):
+                    state[positions[j]] = values[j]
+                i += count
+                k += 1
+                yield k, state
+
+    def state(self, k):
+        """Returns the system state after step k.
+        """
+        if k < 0:
+            k += self.steps
+        if not (0 <= k < self.steps):
+            raise IndexError("step out of range")
+        snapshot, counts, positions, values = self._block(k // self.interval)
+        state = array("i", snapshot)
+        n = sum(counts[:k % self.interval])
+        for pos, value in zip(positions[:n], values[:n]):
+            state[pos] = value
+        return state